@@ -4,13 +4,30 @@ Responsável por ler, limpar e padronizar os dados da planilha
 """
 
 import pandas as pd
+import hashlib
+import json
 import logging
 from pathlib import Path
 from typing import Optional, Dict, List, Tuple
 import warnings
 
-from app.config.settings import EXCEL_FILE, DATE_FORMATS
-from app.utils.helpers import normalize_column_name, safe_convert_date, safe_convert_numeric
+from app import __version__
+from app.config.settings import (
+    EXCEL_FILE,
+    PROCESSED_CACHE_DIR,
+    PROCESSING_VERSION,
+    DATE_FORMATS,
+    EXCEL_ENGINE_KWARGS,
+    EXCEL_STREAMING_MIN_SIZE_MB,
+    EXCEL_STREAMING_BATCH_ROWS,
+    CATEGORY_MAX_UNIQUE_RATIO
+)
+from app.utils.helpers import (
+    normalize_columns,
+    convert_date_series,
+    convert_numeric_series,
+    is_text_dtype
+)
 from app.security.validation import (
     validate_file_path, 
     validate_dataframe, 
@@ -20,23 +37,132 @@ from app.security.validation import (
 warnings.filterwarnings('ignore')
 logger = logging.getLogger(__name__)
 
+# Cache dos papéis de colunas detectados (coluna de data, colunas numéricas)
+# Chave: nomes/tipos das colunas + hash das primeiras linhas amostradas
+_COLUMN_ROLES_CACHE: Dict[tuple, Tuple[Optional[str], List[str]]] = {}
+_COLUMN_ROLES_CACHE_SIZE = 32
+# Linhas amostradas por coluna na detecção (conversão vetorizada, amostra maior é barata)
+_COLUMN_ROLES_SAMPLE_ROWS = 200
+
+
+def _column_roles_key(df: pd.DataFrame) -> tuple:
+    """
+    Gera chave de cache para a detecção de colunas de um DataFrame
+    """
+    sample = df.head(_COLUMN_ROLES_SAMPLE_ROWS)
+    sample_hash = int(pd.util.hash_pandas_object(sample, index=False).sum())
+    return (
+        tuple(df.columns),
+        tuple(str(dtype) for dtype in df.dtypes),
+        len(df),
+        sample_hash
+    )
+
+
+def _processing_settings_hash() -> str:
+    """
+    Hash das configurações que alteram o resultado do processamento
+    """
+    settings = {
+        'date_formats': DATE_FORMATS,
+        'category_max_unique_ratio': CATEGORY_MAX_UNIQUE_RATIO
+    }
+    payload = json.dumps(settings, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def _processed_cache_path(cache_dir: Path, excel_path: Path) -> Path:
+    """
+    Arquivo de cache exclusivo para cada Excel de origem (nome + hash do caminho)
+    """
+    source = str(Path(excel_path).resolve())
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+    stem = ''.join(c if c.isalnum() else '_' for c in Path(excel_path).stem)
+    return Path(cache_dir) / f"{stem}-{digest}.parquet"
+
+
+def _open_excel_file(excel_path: Path) -> pd.ExcelFile:
+    """
+    Abre o Excel com o engine mais rápido disponível
+    Tenta calamine (Rust), depois openpyxl em modo somente leitura (sem estilos/fórmulas)
+    e por último o engine padrão do pandas
+    """
+    try:
+        return pd.ExcelFile(excel_path, engine="calamine")
+    except (ImportError, ValueError) as e:
+        logger.info(f"calamine indisponível, usando openpyxl: {e}")
+    
+    try:
+        return pd.ExcelFile(
+            excel_path,
+            engine="openpyxl",
+            engine_kwargs=EXCEL_ENGINE_KWARGS
+        )
+    except ImportError:
+        logger.warning("openpyxl indisponível, usando engine padrão do pandas")
+        return pd.ExcelFile(excel_path)
+
+
+def _read_worksheet_in_batches(worksheet, batch_rows: int = EXCEL_STREAMING_BATCH_ROWS) -> pd.DataFrame:
+    """
+    Converte uma aba openpyxl (modo somente leitura) em DataFrame, em lotes de linhas
+    A primeira linha é usada como cabeçalho, como no pd.read_excel
+    """
+    rows = worksheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+    
+    # Nomes de colunas no mesmo padrão do pandas (Unnamed: N, duplicadas com .N)
+    columns = []
+    seen: Dict[str, int] = {}
+    for idx, name in enumerate(header):
+        name = f"Unnamed: {idx}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    
+    parts = []
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            parts.append(pd.DataFrame(batch, columns=columns))
+            batch = []
+    if batch:
+        parts.append(pd.DataFrame(batch, columns=columns))
+    
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    
+    return pd.concat(parts, ignore_index=True).infer_objects()
+
 
 class DataLoader:
     """
     Classe responsável por carregar e processar dados do Excel
     """
     
-    def __init__(self, excel_path: Optional[Path] = None):
+    def __init__(self, excel_path: Optional[Path] = None, cache_dir: Optional[Path] = PROCESSED_CACHE_DIR):
         """
         Inicializa o loader com o caminho do arquivo Excel
+        cache_dir: diretório do cache em parquet dos dados processados (None desativa o cache em disco)
         """
         self.excel_path = excel_path or EXCEL_FILE
+        self.cache_path = None if cache_dir is None else _processed_cache_path(cache_dir, self.excel_path)
         self.raw_data: Dict[str, pd.DataFrame] = {}
+        self._cached_sheet_names: List[str] = []
         self.processed_data: Optional[pd.DataFrame] = None
+        self.numeric_columns: List[str] = []
+        self._loaded_from_cache = False
         
     def load_excel(self) -> Tuple[bool, Optional[str]]:
         """
         Carrega o arquivo Excel e valida
+        Se houver cache processado para a mesma versão do arquivo, o Excel não é lido
         Retorna: (success, error_message)
         """
         try:
@@ -45,35 +171,165 @@ class DataLoader:
             if not is_valid:
                 return False, error
             
-            # Lê todas as abas do Excel
-            excel_file = pd.ExcelFile(self.excel_path)
-            sheet_names = excel_file.sheet_names
-            
-            if not sheet_names:
-                return False, "Arquivo Excel não contém abas"
+            if self._load_processed_cache():
+                return True, None
             
-            logger.info(f"Carregando {len(sheet_names)} aba(s) do Excel")
+            return self._read_sheets()
             
-            # Carrega cada aba
+        except Exception as e:
+            error_msg = f"Erro ao carregar Excel: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+    
+    def _should_stream(self) -> bool:
+        """
+        Indica se o Excel deve ser lido em lotes (opcional, desativado por padrão)
+        """
+        if EXCEL_STREAMING_MIN_SIZE_MB is None:
+            return False
+        path = Path(self.excel_path)
+        if path.suffix.lower() != '.xlsx':
+            return False
+        return path.stat().st_size / (1024 * 1024) > EXCEL_STREAMING_MIN_SIZE_MB
+    
+    def _read_sheets(self) -> Tuple[bool, Optional[str]]:
+        """
+        Lê todas as abas do Excel para raw_data
+        Retorna: (success, error_message)
+        """
+        if self._should_stream():
+            try:
+                return self._read_sheets_streaming()
+            except ImportError:
+                logger.warning("openpyxl indisponível, lendo Excel grande de uma vez")
+        
+        excel_file = _open_excel_file(self.excel_path)
+        sheet_names = excel_file.sheet_names
+        
+        if not sheet_names:
+            return False, "Arquivo Excel não contém abas"
+        
+        logger.info(f"Carregando {len(sheet_names)} aba(s) do Excel")
+        
+        # Carrega todas as abas em uma única leitura do workbook
+        try:
+            sheets = pd.read_excel(excel_file, sheet_name=None)
+        except Exception as e:
+            # Alguma aba corrompida: lê aba por aba para aproveitar as válidas
+            logger.warning(f"Erro ao ler abas em lote, lendo individualmente: {e}")
+            sheets = {}
             for sheet in sheet_names:
                 try:
-                    df = pd.read_excel(excel_file, sheet_name=sheet)
-                    if not df.empty:
-                        self.raw_data[sheet] = df
-                        logger.info(f"Aba '{sheet}': {len(df)} linhas, {len(df.columns)} colunas")
+                    sheets[sheet] = pd.read_excel(excel_file, sheet_name=sheet)
                 except Exception as e:
                     logger.warning(f"Erro ao ler aba '{sheet}': {e}")
                     continue
+        
+        for sheet, df in sheets.items():
+            if not df.empty:
+                self.raw_data[sheet] = df
+                logger.info(f"Aba '{sheet}': {len(df)} linhas, {len(df.columns)} colunas")
+        
+        if not self.raw_data:
+            return False, "Nenhuma aba válida encontrada no Excel"
+        
+        return True, None
+    
+    def _read_sheets_streaming(self) -> Tuple[bool, Optional[str]]:
+        """
+        Lê as abas linha a linha com openpyxl, montando o DataFrame em lotes
+        Evita manter todas as células do workbook e o DataFrame em memória ao mesmo tempo
+        Retorna: (success, error_message)
+        """
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(self.excel_path, **EXCEL_ENGINE_KWARGS)
+        try:
+            if not workbook.sheetnames:
+                return False, "Arquivo Excel não contém abas"
             
-            if not self.raw_data:
-                return False, "Nenhuma aba válida encontrada no Excel"
+            logger.info(f"Carregando {len(workbook.sheetnames)} aba(s) do Excel em lotes")
             
-            return True, None
+            for sheet in workbook.sheetnames:
+                try:
+                    df = _read_worksheet_in_batches(workbook[sheet])
+                except Exception as e:
+                    logger.warning(f"Erro ao ler aba '{sheet}': {e}")
+                    continue
+                
+                if not df.empty:
+                    self.raw_data[sheet] = df
+                    logger.info(f"Aba '{sheet}': {len(df)} linhas, {len(df.columns)} colunas")
+        finally:
+            workbook.close()
+        
+        if not self.raw_data:
+            return False, "Nenhuma aba válida encontrada no Excel"
+        
+        return True, None
+    
+    def _cache_metadata(self) -> Dict:
+        """
+        Identifica a versão do Excel e do processamento que geraram o cache
+        """
+        stat = Path(self.excel_path).stat()
+        return {
+            'source': str(Path(self.excel_path).resolve()),
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'version': __version__,
+            'processing_version': PROCESSING_VERSION,
+            'settings_hash': _processing_settings_hash()
+        }
+    
+    def _load_processed_cache(self) -> bool:
+        """
+        Carrega dados processados do parquet se o Excel não mudou desde a gravação
+        """
+        if self.cache_path is None:
+            return False
+        
+        meta_path = Path(self.cache_path).with_suffix('.json')
+        try:
+            if not Path(self.cache_path).exists() or not meta_path.exists():
+                return False
+            
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            sheet_names = metadata.pop('sheet_names', [])
+            if metadata != self._cache_metadata():
+                return False
             
+            self.processed_data = pd.read_parquet(self.cache_path)
+            self._cached_sheet_names = sheet_names
+            self.numeric_columns = self.processed_data.select_dtypes(include=['number']).columns.tolist()
+            self._loaded_from_cache = True
+            logger.info(f"Dados carregados do cache: {self.cache_path}")
+            return True
+        
         except Exception as e:
-            error_msg = f"Erro ao carregar Excel: {str(e)}"
-            logger.error(error_msg)
-            return False, error_msg
+            logger.warning(f"Erro ao ler cache de dados processados: {e}")
+            return False
+    
+    def _save_processed_cache(self):
+        """
+        Grava os dados processados em parquet junto com a versão do Excel de origem
+        e os nomes das abas lidas
+        """
+        if self.cache_path is None or self.processed_data is None:
+            return
+        
+        cache_path = Path(self.cache_path)
+        meta_path = cache_path.with_suffix('.json')
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.processed_data.to_parquet(cache_path, compression='zstd', index=False)
+            metadata = self._cache_metadata()
+            metadata['sheet_names'] = self.get_sheet_names()
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
+        except Exception as e:
+            logger.warning(f"Erro ao gravar cache de dados processados: {e}")
     
     def process_data(self, sheet_name: Optional[str] = None) -> Tuple[bool, Optional[str]]:
         """
@@ -81,15 +337,26 @@ class DataLoader:
         Retorna: (success, error_message)
         """
         try:
+            # Dados da aba padrão já vieram processados do cache
+            if self._loaded_from_cache and sheet_name is None:
+                return True, None
+            
+            if not self.raw_data and self._loaded_from_cache:
+                success, error = self._read_sheets()
+                if not success:
+                    return False, error
+            
             if not self.raw_data:
                 return False, "Nenhum dado carregado. Execute load_excel() primeiro."
             
-            # Seleciona a aba
-            if sheet_name and sheet_name in self.raw_data:
-                df = self.raw_data[sheet_name].copy()
+            # Seleciona a aba (sem cópia: a sanitização já gera um novo DataFrame)
+            use_default_sheet = not (sheet_name and sheet_name in self.raw_data)
+            if not use_default_sheet:
+                raw_df = self.raw_data[sheet_name]
             else:
                 # Usa a primeira aba disponível
-                df = list(self.raw_data.values())[0].copy()
+                raw_df = list(self.raw_data.values())[0]
+            df = raw_df
             
             # Valida DataFrame
             is_valid, error = validate_dataframe(df)
@@ -97,23 +364,37 @@ class DataLoader:
                 return False, error
             
             # Sanitiza dados
-            df = sanitize_dataframe(df)
+            df = sanitize_dataframe(df, copy=False)
+            if df is raw_df:
+                # Sanitização falhou e devolveu a aba original: preserva raw_data
+                df = df.copy()
             
             # Normaliza nomes de colunas
-            df.columns = [normalize_column_name(col) for col in df.columns]
+            df.columns = normalize_columns(df.columns)
+            
+            # Reaproveita detecção de colunas já feita para os mesmos dados
+            roles_key = _column_roles_key(df)
+            cached_roles = _COLUMN_ROLES_CACHE.get(roles_key)
             
             # Identifica e processa colunas de data
-            date_col = self._find_date_column(df)
+            if cached_roles:
+                date_col = cached_roles[0]
+            else:
+                date_col = self._find_date_column(df)
             if date_col:
-                df[date_col] = df[date_col].apply(
-                    lambda x: safe_convert_date(x, DATE_FORMATS)
-                )
+                df[date_col] = convert_date_series(df[date_col], DATE_FORMATS)
                 df = df.rename(columns={date_col: 'data'})
             
             # Identifica e processa colunas numéricas
-            numeric_cols = self._find_numeric_columns(df)
+            if cached_roles:
+                numeric_cols = list(cached_roles[1])
+            else:
+                numeric_cols = self._find_numeric_columns(df)
+                if len(_COLUMN_ROLES_CACHE) >= _COLUMN_ROLES_CACHE_SIZE:
+                    _COLUMN_ROLES_CACHE.clear()
+                _COLUMN_ROLES_CACHE[roles_key] = (date_col, list(numeric_cols))
             for col in numeric_cols:
-                df[col] = df[col].apply(safe_convert_numeric)
+                df[col] = convert_numeric_series(df[col])
             
             # Remove linhas onde todas as colunas numéricas são nulas
             if numeric_cols:
@@ -125,19 +406,27 @@ class DataLoader:
                 logger.info("Coluna 'rota' removida")
             
             # Remove duplicatas
-            df = df.drop_duplicates()
+            df = self._drop_duplicates(df, numeric_cols)
+            
+            # Reduz tipos para economizar memória nas agregações
+            df = self._downcast_dtypes(df)
             
             # Reseta índice
             df = df.reset_index(drop=True)
             
-            # Valida novamente após processamento
-            is_valid, error = validate_dataframe(df)
-            if not is_valid:
-                return False, f"Erro após processamento: {error}"
+            # Processamento só remove linhas: basta checar se sobrou algum dado
+            if df.empty:
+                return False, "Erro após processamento: DataFrame está vazio"
             
             self.processed_data = df
+            self.numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
+            self._loaded_from_cache = False
             logger.info(f"Dados processados: {len(df)} linhas, {len(df.columns)} colunas")
             
+            # Só a aba padrão é persistida (é a usada pelo dashboard)
+            if use_default_sheet:
+                self._save_processed_cache()
+            
             return True, None
             
         except Exception as e:
@@ -156,11 +445,10 @@ class DataLoader:
             col_lower = str(col).lower()
             if any(keyword in col_lower for keyword in date_keywords):
                 # Tenta converter algumas amostras para confirmar
-                sample = df[col].dropna().head(10)
+                sample = df[col].dropna().head(_COLUMN_ROLES_SAMPLE_ROWS)
                 if len(sample) > 0:
-                    converted = sum(1 for val in sample 
-                                  if safe_convert_date(val, DATE_FORMATS) is not None)
-                    if converted >= len(sample) * 0.5:  # 50% de sucesso
+                    converted = convert_date_series(sample, DATE_FORMATS).notna().mean()
+                    if converted >= 0.5:  # 50% de sucesso
                         return col
         
         return None
@@ -186,26 +474,70 @@ class DataLoader:
             # Se contém palavras-chave de valor
             if any(keyword in col_lower for keyword in value_keywords):
                 # Tenta converter amostra
-                sample = df[col].dropna().head(20)
+                sample = df[col].dropna().head(_COLUMN_ROLES_SAMPLE_ROWS)
                 if len(sample) > 0:
-                    converted = sum(1 for val in sample 
-                                  if safe_convert_numeric(val) is not None)
-                    if converted >= len(sample) * 0.7:  # 70% de sucesso
+                    converted = convert_numeric_series(sample).notna().mean()
+                    if converted >= 0.7:  # 70% de sucesso
                         numeric_cols.append(col)
         
         return numeric_cols
     
+    def _drop_duplicates(self, df: pd.DataFrame, numeric_cols: List[str]) -> pd.DataFrame:
+        """
+        Remove linhas duplicadas comparando primeiro só as colunas-chave (data e numéricas)
+        Apenas as linhas repetidas nessas colunas passam pela comparação completa
+        """
+        key_cols = [col for col in ['data'] + list(numeric_cols) if col in df.columns]
+        if not key_cols or len(key_cols) == len(df.columns):
+            return df.drop_duplicates()
+        
+        # Linha duplicada por completo também é duplicada nas colunas-chave
+        candidates = df.duplicated(subset=key_cols, keep=False)
+        if not candidates.any():
+            return df
+        
+        duplicated = df[candidates].duplicated()
+        return df.drop(index=duplicated[duplicated].index)
+    
+    def _downcast_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduz tipos das colunas para economizar memória
+        Inteiros são reduzidos e colunas de texto com poucos valores únicos viram
+        'category'; floats ficam em float64 (somas e médias em float32 perdem precisão)
+        """
+        for col in df.select_dtypes(include=['integer']).columns:
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+        
+        if len(df) > 0:
+            for col in df.columns:
+                if col == 'data':
+                    continue
+                if is_text_dtype(df[col]) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+                    if df[col].nunique(dropna=False) / len(df) < CATEGORY_MAX_UNIQUE_RATIO:
+                        df[col] = df[col].astype('category')
+        
+        return df
+    
     def get_data(self) -> Optional[pd.DataFrame]:
         """
         Retorna os dados processados
         """
         return self.processed_data
     
+    def get_numeric_columns(self) -> List[str]:
+        """
+        Retorna colunas numéricas dos dados processados
+        """
+        return list(self.numeric_columns)
+    
     def get_sheet_names(self) -> List[str]:
         """
         Retorna lista de nomes das abas disponíveis
+        Após carregar do cache (sem ler o Excel), usa os nomes gravados junto ao cache
         """
-        return list(self.raw_data.keys())
+        if self.raw_data:
+            return list(self.raw_data.keys())
+        return list(self._cached_sheet_names)
     
     def get_summary(self) -> Dict:
         """
@@ -233,8 +565,7 @@ class DataLoader:
                     'max': dates.max()
                 }
         
-        # Identifica colunas numéricas
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        summary['numeric_columns'] = numeric_cols
+        # Colunas numéricas já identificadas no processamento
+        summary['numeric_columns'] = list(self.numeric_columns)
         
         return summary
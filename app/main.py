@@ -9,7 +9,7 @@ import plotly.graph_objects as go
 import logging
 from pathlib import Path
 import sys
-from pathlib import Path
+from typing import Optional
 
 # Adiciona diretório raiz ao path para garantir que o pacote 'app' seja encontrado
 root_path = Path(__file__).resolve().parent.parent
@@ -28,7 +28,9 @@ from app.ui.charts import (
     create_pie_chart,
     create_area_chart,
     create_ranking_chart,
-    create_table
+    create_table,
+    format_hours_series,
+    to_plot_array
 )
 
 # Configuração de logging
@@ -50,10 +52,21 @@ st.set_page_config(
 apply_custom_css()
 
 
-@st.cache_data(ttl=3600)
-def load_data():
+def get_excel_mtime() -> Optional[float]:
+    """
+    Retorna data de modificação do Excel (None se o arquivo não existir)
+    """
+    try:
+        return EXCEL_FILE.stat().st_mtime
+    except OSError:
+        return None
+
+
+@st.cache_data(show_spinner=False)
+def load_data(excel_mtime: Optional[float]):
     """
     Carrega e processa dados do Excel (com cache)
+    O cache é invalidado apenas quando o arquivo muda (excel_mtime)
     """
     loader = DataLoader()
     
@@ -75,6 +88,32 @@ def load_data():
     return df, summary
 
 
+def find_column_roles(columns) -> dict:
+    """
+    Identifica em uma única passada as colunas usadas pelo dashboard
+    Retorna dicionário papel -> nome da coluna (ou None)
+    """
+    roles = {'motorista': None, 'km': None, 'spr': None, 'paradas': None, 'orh': None}
+    
+    for col in columns:
+        col_lower = str(col).lower()
+        
+        # Motorista: primeira coluna que contém o termo
+        if roles['motorista'] is None and 'motorista' in col_lower:
+            roles['motorista'] = col
+        
+        if col_lower == 'km':
+            roles['km'] = col
+        elif col_lower == 'spr':
+            roles['spr'] = col
+        elif 'parada' in col_lower:
+            roles['paradas'] = col
+        elif col_lower == 'orh':
+            roles['orh'] = col
+    
+    return roles
+
+
 def main():
     """
     Função principal do dashboard
@@ -84,15 +123,22 @@ def main():
     
     # Carrega dados
     with st.spinner("🔄 Carregando dados..."):
-        df, summary = load_data()
+        excel_mtime = get_excel_mtime()
+        df, summary = load_data(excel_mtime)
     
     if df is None or df.empty:
+        # Não mantém falhas em cache: tenta novamente na próxima execução
+        load_data.clear()
         st.error("❌ Não foi possível carregar os dados. Verifique o arquivo Excel.")
         st.info("💡 Certifique-se de que o arquivo 'modelo Power BI .xlsx' está no diretório raiz do projeto.")
         return
     
     # Sidebar com filtros
-    filters = render_sidebar(df)
+    filters = render_sidebar(
+        df,
+        numeric_columns=summary.get('numeric_columns'),
+        data_version=excel_mtime
+    )
     
     # Aplica filtros
     df_filtered = apply_filters(df, filters)
@@ -108,32 +154,13 @@ def main():
     processor = DataProcessor()
     df_enriched = processor.enrich_with_periods(df_filtered)
     
-    # Identifica colunas principais
-    numeric_cols = df_filtered.select_dtypes(include=['number']).columns.tolist()
-    
-    # Identifica coluna de motorista
-    motorista_col = None
-    for col in df_filtered.columns:
-        if 'motorista' in str(col).lower():
-            motorista_col = col
-            break
-    
-    # Identifica colunas específicas
-    km_col = None
-    spr_col = None
-    paradas_col = None
-    orh_col = None
-    
-    for col in df_filtered.columns:
-        col_lower = str(col).lower()
-        if col_lower == 'km':
-            km_col = col
-        elif col_lower == 'spr':
-            spr_col = col
-        elif 'parada' in col_lower:
-            paradas_col = col
-        elif col_lower == 'orh':
-            orh_col = col
+    # Identifica colunas de motorista, km, spr, paradas e orh
+    roles = find_column_roles(df_filtered.columns)
+    motorista_col = roles['motorista']
+    km_col = roles['km']
+    spr_col = roles['spr']
+    paradas_col = roles['paradas']
+    orh_col = roles['orh']
     
     # ========================================================================
     # SEÇÃO 1: KPIs PRINCIPAIS
@@ -141,50 +168,47 @@ def main():
     st.markdown("## 📈 Indicadores Principais")
     st.markdown("")
     
-    # Calcula KPIs específicos
+    # Calcula KPIs específicos (soma, média e contagem em uma única agregação)
     kpis_display = {}
     
-    if km_col and km_col in df_filtered.columns:
-        km_series = pd.to_numeric(df_filtered[km_col], errors='coerce')
-        if km_series.notna().any():
-            total_km = km_series.sum()
-            media_km = km_series.mean()
-            kpis_display['Total KM'] = f"{total_km:,.2f}"
-            kpis_display['Média KM'] = f"{media_km:,.2f}"
+    kpi_cols = [col for col in (km_col, spr_col, paradas_col, orh_col) if col]
+    kpi_stats = pd.DataFrame()
+    if kpi_cols:
+        kpi_stats = (
+            df_filtered[kpi_cols]
+            .apply(pd.to_numeric, errors='coerce')
+            .agg(['sum', 'mean', 'count'])
+        )
+    
+    def has_kpi(col):
+        return col in kpi_stats.columns and kpi_stats.loc['count', col] > 0
     
-    if spr_col and spr_col in df_filtered.columns:
-        spr_series = pd.to_numeric(df_filtered[spr_col], errors='coerce')
-        if spr_series.notna().any():
-            total_spr = spr_series.sum()
-            media_spr = spr_series.mean()
-            kpis_display['Total Caixas (SPR)'] = f"{total_spr:,.0f}"
-            kpis_display['Média Caixas'] = f"{media_spr:,.2f}"
+    if has_kpi(km_col):
+        total_km = kpi_stats.loc['sum', km_col]
+        media_km = kpi_stats.loc['mean', km_col]
+        kpis_display['Total KM'] = f"{total_km:,.2f}"
+        kpis_display['Média KM'] = f"{media_km:,.2f}"
     
-    if paradas_col and paradas_col in df_filtered.columns:
-        paradas_series = pd.to_numeric(df_filtered[paradas_col], errors='coerce')
-        if paradas_series.notna().any():
-            total_paradas = paradas_series.sum()
-            media_paradas = paradas_series.mean()
-            kpis_display['Total Paradas'] = f"{total_paradas:,.0f}"
-            kpis_display['Média Paradas'] = f"{media_paradas:,.2f}"
+    if has_kpi(spr_col):
+        total_spr = kpi_stats.loc['sum', spr_col]
+        media_spr = kpi_stats.loc['mean', spr_col]
+        kpis_display['Total Caixas (SPR)'] = f"{total_spr:,.0f}"
+        kpis_display['Média Caixas'] = f"{media_spr:,.2f}"
+    
+    if has_kpi(paradas_col):
+        total_paradas = kpi_stats.loc['sum', paradas_col]
+        media_paradas = kpi_stats.loc['mean', paradas_col]
+        kpis_display['Total Paradas'] = f"{total_paradas:,.0f}"
+        kpis_display['Média Paradas'] = f"{media_paradas:,.2f}"
     
     # Adiciona KPIs de ORH (formato horas)
-    if orh_col and orh_col in df_filtered.columns:
-        # Garante que a coluna seja numérica antes de calcular
-        orh_series = pd.to_numeric(df_filtered[orh_col], errors='coerce')
-        if orh_series.notna().any():
-            total_orh = orh_series.sum()
-            media_orh = orh_series.mean()
-            # Formata em horas (HH:MM)
-            def format_hours_kpi(decimal_hours):
-                if pd.isna(decimal_hours):
-                    return "0:00"
-                hours = int(decimal_hours)
-                minutes = int((decimal_hours - hours) * 60)
-                return f"{hours}:{minutes:02d}"
-            
-            kpis_display['Total ORH'] = format_hours_kpi(total_orh)
-            kpis_display['Média ORH'] = format_hours_kpi(media_orh)
+    if has_kpi(orh_col):
+        total_orh = kpi_stats.loc['sum', orh_col]
+        media_orh = kpi_stats.loc['mean', orh_col]
+        # Formata em horas (HH:MM)
+        total_orh_fmt, media_orh_fmt = format_hours_series([total_orh, media_orh])
+        kpis_display['Total ORH'] = total_orh_fmt
+        kpis_display['Média ORH'] = media_orh_fmt
     
     # Adiciona contagem de motoristas
     if motorista_col:
@@ -257,27 +281,37 @@ def main():
         
         # Agrupa dados por motorista
         if motorista_col:
-            # Cria cópia do DataFrame para garantir tipos numéricos
-            df_agg = df_filtered.copy()
+            # Só cria novo DataFrame se alguma coluna precisar de conversão numérica
+            df_agg = df_filtered
             agg_dict = {}
             
             if km_col and km_col in df_filtered.columns:
                 if not pd.api.types.is_numeric_dtype(df_agg[km_col]):
-                    df_agg[km_col] = pd.to_numeric(df_agg[km_col], errors='coerce')
+                    df_agg = df_agg.assign(**{km_col: pd.to_numeric(df_agg[km_col], errors='coerce')})
                 agg_dict[km_col] = 'sum'
             
             if spr_col and spr_col in df_filtered.columns:
                 if not pd.api.types.is_numeric_dtype(df_agg[spr_col]):
-                    df_agg[spr_col] = pd.to_numeric(df_agg[spr_col], errors='coerce')
+                    df_agg = df_agg.assign(**{spr_col: pd.to_numeric(df_agg[spr_col], errors='coerce')})
                 agg_dict[spr_col] = 'sum'
             
             if paradas_col and paradas_col in df_filtered.columns:
                 if not pd.api.types.is_numeric_dtype(df_agg[paradas_col]):
-                    df_agg[paradas_col] = pd.to_numeric(df_agg[paradas_col], errors='coerce')
+                    df_agg = df_agg.assign(**{paradas_col: pd.to_numeric(df_agg[paradas_col], errors='coerce')})
                 agg_dict[paradas_col] = 'sum'
             
+            if orh_col and orh_col in df_filtered.columns:
+                if not pd.api.types.is_numeric_dtype(df_agg[orh_col]):
+                    df_agg = df_agg.assign(**{orh_col: pd.to_numeric(df_agg[orh_col], errors='coerce')})
+                agg_dict[orh_col] = 'sum'
+            
             if agg_dict:
-                motorista_stats = df_agg.groupby(motorista_col).agg(agg_dict).reset_index()
+                # sort=False: a ordenação final é por valor, não por nome do motorista
+                motorista_stats = (
+                    df_agg.groupby(motorista_col, observed=True, sort=False)
+                    .agg(agg_dict)
+                    .reset_index()
+                )
                 
                 # Renomeia colunas
                 rename_dict = {motorista_col: 'Motorista'}
@@ -287,6 +321,8 @@ def main():
                     rename_dict[spr_col] = 'Total SPR'
                 if paradas_col in motorista_stats.columns:
                     rename_dict[paradas_col] = 'Total Paradas'
+                if orh_col in motorista_stats.columns:
+                    rename_dict[orh_col] = 'Total ORH'
                 
                 motorista_stats = motorista_stats.rename(columns=rename_dict)
                 
@@ -294,6 +330,10 @@ def main():
                 sort_col = 'Total KM' if 'Total KM' in motorista_stats.columns else motorista_stats.columns[1]
                 motorista_stats = motorista_stats.sort_values(sort_col, ascending=False)
                 
+                # Formata ORH em horas (HH:MM) após ordenar
+                if 'Total ORH' in motorista_stats.columns:
+                    motorista_stats['Total ORH'] = format_hours_series(motorista_stats['Total ORH'])
+                
                 col1, col2 = st.columns(2)
                 
                 with col1:
@@ -302,18 +342,19 @@ def main():
                         fig_comparativo = go.Figure()
                         
                         motorista_stats_top = motorista_stats.head(10)
+                        motorista_names = to_plot_array(motorista_stats_top['Motorista'])
                         
                         fig_comparativo.add_trace(go.Bar(
                             name='KM',
-                            x=motorista_stats_top['Motorista'],
-                            y=motorista_stats_top['Total KM'],
+                            x=motorista_names,
+                            y=to_plot_array(motorista_stats_top['Total KM']),
                             marker_color=COLORS['primary']
                         ))
                         
                         fig_comparativo.add_trace(go.Bar(
                             name='SPR',
-                            x=motorista_stats_top['Motorista'],
-                            y=motorista_stats_top['Total SPR'],
+                            x=motorista_names,
+                            y=to_plot_array(motorista_stats_top['Total SPR']),
                             marker_color=COLORS['success']
                         ))
                         
@@ -4,15 +4,30 @@ Protege contra dados inválidos, corrompidos e ataques
 """
 
 import pandas as pd
+import numpy as np
 import os
 from pathlib import Path
 from typing import Tuple, Optional, List
 import logging
 
+from app.config.settings import MAX_FILE_SIZE_MB
+
 logger = logging.getLogger(__name__)
 
+# pyarrow é opcional: sem ele a sanitização usa strings Python
+# Strings Arrow com NaN como nulo (o dtype 'str' padrão do pandas 3), não pd.NA:
+# a conversão só muda a representação, não a semântica dos nulos
+try:
+    import pyarrow  # noqa: F401
+    try:
+        STRING_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        STRING_DTYPE = "string[pyarrow_numpy]"  # pandas 2.2
+except ImportError:
+    STRING_DTYPE = None
+
 
-def validate_file_path(file_path: Path) -> Tuple[bool, Optional[str]]:
+def validate_file_path(file_path: Path, max_size_mb: float = MAX_FILE_SIZE_MB) -> Tuple[bool, Optional[str]]:
     """
     Valida se o arquivo existe e é acessível
     Retorna: (is_valid, error_message)
@@ -26,8 +41,8 @@ def validate_file_path(file_path: Path) -> Tuple[bool, Optional[str]]:
         
         # Verifica tamanho do arquivo
         file_size_mb = file_path.stat().st_size / (1024 * 1024)
-        if file_size_mb > 50:  # 50MB máximo
-            return False, f"Arquivo muito grande: {file_size_mb:.2f}MB (máximo: 50MB)"
+        if file_size_mb > max_size_mb:
+            return False, f"Arquivo muito grande: {file_size_mb:.2f}MB (máximo: {max_size_mb}MB)"
         
         return True, None
     
@@ -64,19 +79,30 @@ def validate_dataframe(df: pd.DataFrame, min_rows: int = 1) -> Tuple[bool, Optio
         return False, f"Erro ao validar DataFrame: {str(e)}"
 
 
-def sanitize_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+def sanitize_dataframe(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Remove ou trata dados potencialmente perigosos
+    copy=False evita a cópia inicial quando o chamador já é dono do DataFrame
     """
     try:
-        df_clean = df.copy()
+        df_clean = df.copy() if copy else df
         
-        # Remove linhas completamente vazias
+        # Remove linhas completamente vazias (gera novo DataFrame)
         df_clean = df_clean.dropna(how='all')
         
         # Limita tamanho de strings para prevenir DoS
-        for col in df_clean.select_dtypes(include=['object']).columns:
-            df_clean[col] = df_clean[col].astype(str).str[:1000]
+        # Todas as colunas de texto são convertidas e atribuídas de uma vez
+        obj_cols = df_clean.select_dtypes(include=['object']).columns
+        if len(obj_cols) > 0:
+            if STRING_DTYPE:
+                # Strings Arrow: conversão e corte feitos em C, nulos preservados
+                df_clean[obj_cols] = df_clean[obj_cols].astype(STRING_DTYPE).apply(
+                    lambda col: col.str.slice(0, 1000)
+                )
+            else:
+                df_clean[obj_cols] = df_clean[obj_cols].astype(str).apply(
+                    lambda col: col.str[:1000]
+                )
         
         return df_clean
     
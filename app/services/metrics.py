@@ -7,23 +7,95 @@ import pandas as pd
 import numpy as np
 from typing import Optional, Dict, List, Tuple
 from datetime import datetime, timedelta
+import functools
 import logging
 
-from app.utils.helpers import calculate_percentage_change
+from app.utils.helpers import calculate_percentage_change, group_sum, is_text_dtype
 
 logger = logging.getLogger(__name__)
 
+# Polars é opcional: sem ele o backend 'polars' recai no pandas
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+# Frequências do resample -> (janela do group_by_dynamic, frequência de período do pandas)
+_POLARS_FREQS = {
+    'D': ('1d', 'D'),
+    'W': ('1w', 'W'),
+    'M': ('1mo', 'M'),
+    'ME': ('1mo', 'M'),
+    'Y': ('1y', 'Y'),
+    'YE': ('1y', 'Y')
+}
+
+
+def _reduce_all(values: np.ndarray) -> Dict:
+    """
+    Reduz um array sem nulos em todas as estatísticas de KPI
+    A mediana usa np.median (seleção por partição, O(n))
+    A soma acumula em float64 mesmo quando o array é float32/int reduzido
+    """
+    if values.size == 0:
+        return {
+            'total': 0.0,
+            'media': np.nan,
+            'mediana': np.nan,
+            'minimo': np.nan,
+            'maximo': np.nan
+        }
+    
+    total = values.sum(dtype=np.float64)
+    return {
+        'total': total,
+        'media': total / values.size,
+        'mediana': np.median(values),
+        'minimo': values.min(),
+        'maximo': values.max()
+    }
+
+
+def _cached_method(method):
+    """
+    Memoriza o resultado de um método por instância e argumentos
+    Cada filtro gera uma nova instância, então o cache nunca fica desatualizado
+    DataFrames e dicionários são devolvidos como cópia para proteger o cache
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        try:
+            result = self._cache[key]
+        except KeyError:
+            result = self._cache[key] = method(self, *args, **kwargs)
+        except TypeError:
+            # Argumentos não hasheáveis: calcula sem cache
+            return method(self, *args, **kwargs)
+        
+        if isinstance(result, (pd.DataFrame, dict)):
+            return result.copy()
+        return result
+    
+    return wrapper
+
 
 class MetricsCalculator:
     """
     Classe responsável por calcular métricas e KPIs
     """
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, backend: str = 'pandas'):
         """
         Inicializa com DataFrame processado
+        O DataFrame é apenas lido, por isso é mantido por referência (sem cópia)
+        backend: 'pandas' (padrão) ou 'polars' para as agregações pesadas
         """
-        self.df = df.copy()
+        self.df = df
+        self.backend = backend
+        if backend == 'polars' and pl is None:
+            logger.warning("Polars não instalado; usando backend pandas")
+            self.backend = 'pandas'
         self._prepare_data()
     
     def _prepare_data(self):
@@ -42,36 +114,99 @@ class MetricsCalculator:
             self.date_column = 'data'
         else:
             self.date_column = None
+        
+        self._reset_caches()
     
-    def get_total(self, column: Optional[str] = None) -> float:
+    def _reset_caches(self):
         """
-        Calcula total de uma coluna
+        Inicializa os caches que dependem das linhas do DataFrame
+        """
+        # Resultados de métodos já calculados (ver _cached_method)
+        self._cache: Dict[Tuple, object] = {}
+        
+        # Estatísticas por coluna já calculadas (ver _column_stats)
+        self._stats_cache: Dict[str, Dict] = {}
+        
+        # Datas/valores ordenados para busca binária (ver _sorted_dates)
+        self._sorted_dates_checked = False
+        self._sorted_dates_cache: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        
+        # Cópia em Polars, convertida uma única vez (ver _polars_frame)
+        self._pl = None
+    
+    def _polars_frame(self):
+        """
+        Retorna o DataFrame convertido para Polars (None se o backend for pandas
+        ou se a conversão falhar)
+        """
+        if self.backend != 'polars':
+            return None
+        
+        if self._pl is None:
+            try:
+                self._pl = pl.from_pandas(self.df)
+            except Exception as e:
+                logger.warning(f"Falha ao converter dados para Polars, usando pandas: {str(e)}")
+                self.backend = 'pandas'
+                return None
+        return self._pl
+    
+    def _column_stats(self, col: str) -> Optional[Dict]:
+        """
+        Calcula soma, média, mediana, mínimo e máximo de uma coluna numérica
+        em uma única extração para NumPy (resultado em cache por coluna)
+        Retorna None para colunas não numéricas
+        """
+        if col in self._stats_cache:
+            return self._stats_cache[col]
+        
+        if not pd.api.types.is_numeric_dtype(self.df[col]):
+            return None
+        
+        # Lê no tipo reduzido pelo loader (int8/int16...) sem copiar para float64
+        series = self.df[col]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iuf':
+            values = series.to_numpy()
+        else:
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        stats = _reduce_all(values)
+        self._stats_cache[col] = stats
+        return stats
+    
+    def _get_stat(self, column: Optional[str], stat: str, method: str) -> float:
+        """
+        Retorna uma estatística da coluna (0.0 se a coluna não existir)
         """
         col = column or self.value_column
         if col is None or col not in self.df.columns:
             return 0.0
         
-        return float(self.df[col].sum() or 0)
+        stats = self._column_stats(col)
+        if stats is None:
+            # Coluna não numérica: mantém o comportamento do pandas
+            return float(getattr(self.df[col], method)() or 0)
+        
+        return float(stats[stat] or 0)
+    
+    def get_total(self, column: Optional[str] = None) -> float:
+        """
+        Calcula total de uma coluna
+        """
+        return self._get_stat(column, 'total', 'sum')
     
     def get_average(self, column: Optional[str] = None) -> float:
         """
         Calcula média de uma coluna
         """
-        col = column or self.value_column
-        if col is None or col not in self.df.columns:
-            return 0.0
-        
-        return float(self.df[col].mean() or 0)
+        return self._get_stat(column, 'media', 'mean')
     
     def get_median(self, column: Optional[str] = None) -> float:
         """
         Calcula mediana de uma coluna
         """
-        col = column or self.value_column
-        if col is None or col not in self.df.columns:
-            return 0.0
-        
-        return float(self.df[col].median() or 0)
+        return self._get_stat(column, 'mediana', 'median')
     
     def get_count(self) -> int:
         """
@@ -83,22 +218,15 @@ class MetricsCalculator:
         """
         Retorna valor mínimo
         """
-        col = column or self.value_column
-        if col is None or col not in self.df.columns:
-            return 0.0
-        
-        return float(self.df[col].min() or 0)
+        return self._get_stat(column, 'minimo', 'min')
     
     def get_max(self, column: Optional[str] = None) -> float:
         """
         Retorna valor máximo
         """
-        col = column or self.value_column
-        if col is None or col not in self.df.columns:
-            return 0.0
-        
-        return float(self.df[col].max() or 0)
+        return self._get_stat(column, 'maximo', 'max')
     
+    @_cached_method
     def get_period_comparison(self, 
                              current_start: datetime,
                              current_end: datetime,
@@ -116,25 +244,16 @@ class MetricsCalculator:
                 'change_percent': 0
             }
         
-        # Filtra período atual
-        current_df = self.df[
-            (self.df[self.date_column] >= current_start) &
-            (self.df[self.date_column] <= current_end)
-        ]
-        current_total = float(current_df[self.value_column].sum() or 0)
-        
         # Calcula período anterior se não fornecido
         if previous_start is None or previous_end is None:
             period_days = (current_end - current_start).days + 1
             previous_end = current_start - timedelta(days=1)
             previous_start = previous_end - timedelta(days=period_days - 1)
         
-        # Filtra período anterior
-        previous_df = self.df[
-            (self.df[self.date_column] >= previous_start) &
-            (self.df[self.date_column] <= previous_end)
-        ]
-        previous_total = float(previous_df[self.value_column].sum() or 0)
+        # Soma dos dois períodos
+        current_total, previous_total = self._sum_periods(
+            [(current_start, current_end), (previous_start, previous_end)]
+        )
         
         # Calcula variação
         change = current_total - previous_total
@@ -147,6 +266,74 @@ class MetricsCalculator:
             'change_percent': change_percent
         }
     
+    def _sorted_dates(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Retorna (datas, valores) como arrays NumPy se a coluna de data estiver ordenada
+        Permite localizar períodos por busca binária em vez de máscaras
+        """
+        if not self._sorted_dates_checked:
+            self._sorted_dates_checked = True
+            dates = self.df[self.date_column]
+            if self.value_column is not None and dates.dtype.kind == 'M' and dates.is_monotonic_increasing:
+                if isinstance(dates.dtype, pd.DatetimeTZDtype):
+                    # Com fuso: busca em datetime64 UTC (to_numpy daria objetos Timestamp)
+                    dates = dates.dt.tz_convert(None)
+                values = self.df[self.value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+                self._sorted_dates_cache = (dates.to_numpy(), values)
+        return self._sorted_dates_cache
+    
+    def _date_bounds(self, bounds: List[datetime], dtype: np.dtype) -> np.ndarray:
+        """
+        Converte limites de data para o tipo do array de _sorted_dates
+        Em colunas com fuso os limites são levados para UTC; limites sem fuso geram
+        TypeError, como na comparação direta do pandas
+        """
+        stamps = [pd.Timestamp(bound) for bound in bounds]
+        if isinstance(self.df[self.date_column].dtype, pd.DatetimeTZDtype):
+            stamps = [stamp.tz_convert(None) for stamp in stamps]
+        return np.array([stamp.to_datetime64() for stamp in stamps]).astype(dtype)
+    
+    def _date_slice(self,
+                    start_date: Optional[datetime],
+                    end_date: Optional[datetime]) -> Optional[slice]:
+        """
+        Retorna a fatia de linhas entre as datas por busca binária
+        None se a coluna de data não estiver ordenada
+        """
+        sorted_dates = self._sorted_dates()
+        if sorted_dates is None:
+            return None
+        
+        dates = sorted_dates[0]
+        lo = np.searchsorted(dates, self._date_bounds([start_date], dates.dtype)[0], side='left') if start_date else 0
+        hi = np.searchsorted(dates, self._date_bounds([end_date], dates.dtype)[0], side='right') if end_date else len(dates)
+        return slice(int(lo), int(hi))
+    
+    def _sum_periods(self, periods: List[Tuple[datetime, datetime]]) -> List[float]:
+        """
+        Soma a coluna de valores em cada intervalo [início, fim] de datas
+        """
+        sorted_dates = self._sorted_dates()
+        
+        if sorted_dates is not None:
+            dates, values = sorted_dates
+            starts = self._date_bounds([start for start, _ in periods], dates.dtype)
+            ends = self._date_bounds([end for _, end in periods], dates.dtype)
+            lows = np.searchsorted(dates, starts, side='left')
+            highs = np.searchsorted(dates, ends, side='right')
+            return [float(np.nansum(values[lo:hi])) for lo, hi in zip(lows, highs)]
+        
+        # Datas fora de ordem: filtra por máscara
+        totals = []
+        for start, end in periods:
+            period_df = self.df[
+                (self.df[self.date_column] >= start) &
+                (self.df[self.date_column] <= end)
+            ]
+            totals.append(float(period_df[self.value_column].sum() or 0))
+        return totals
+    
+    @_cached_method
     def get_temporal_aggregation(self, 
                                  freq: str = 'D',
                                  start_date: Optional[datetime] = None,
@@ -158,25 +345,86 @@ class MetricsCalculator:
         if self.date_column is None or self.value_column is None:
             return pd.DataFrame()
         
-        df_filtered = self.df.copy()
+        if freq in _POLARS_FREQS and self._polars_frame() is not None:
+            return self._temporal_aggregation_polars(freq, start_date, end_date)
         
-        # Aplica filtros de data se fornecidos
-        if start_date:
-            df_filtered = df_filtered[df_filtered[self.date_column] >= start_date]
-        if end_date:
-            df_filtered = df_filtered[df_filtered[self.date_column] <= end_date]
+        # Aplica filtros de data se fornecidos (sem copiar o DataFrame)
+        rows = self._date_slice(start_date, end_date)
+        if rows is not None:
+            # Datas ordenadas: o intervalo é uma fatia contígua
+            df_filtered = self.df.iloc[rows]
+        else:
+            dates = self.df[self.date_column]
+            mask = pd.Series(True, index=self.df.index)
+            if start_date:
+                mask &= dates >= start_date
+            if end_date:
+                mask &= dates <= end_date
+            df_filtered = self.df[mask]
         
         if df_filtered.empty:
             return pd.DataFrame()
         
-        # Agrupa por período
-        df_filtered = df_filtered.set_index(self.date_column)
-        aggregated = df_filtered.resample(freq)[self.value_column].agg(['sum', 'mean', 'count'])
+        # Agrupa por período direto na coluna de data (sem set_index)
+        aggregated = df_filtered.resample(freq, on=self.date_column)[self.value_column].agg(['sum', 'mean', 'count'])
         aggregated = aggregated.reset_index()
         aggregated.columns = ['periodo', 'total', 'media', 'contagem']
         
         return aggregated
     
+    def _temporal_aggregation_polars(self,
+                                     freq: str,
+                                     start_date: Optional[datetime],
+                                     end_date: Optional[datetime]) -> pd.DataFrame:
+        """
+        Versão Polars de get_temporal_aggregation
+        Filtro e agrupamento em uma única consulta lazy; o resultado segue
+        os rótulos e períodos vazios do resample do pandas
+        """
+        every, period_freq = _POLARS_FREQS[freq]
+        date_col = pl.col(self.date_column)
+        value_col = pl.col(self.value_column)
+        
+        # Polars exige limites no mesmo fuso da coluna
+        tz = getattr(self.df[self.date_column].dtype, 'tz', None)
+        if tz is not None:
+            start_date = pd.Timestamp(start_date).tz_convert(tz) if start_date else start_date
+            end_date = pd.Timestamp(end_date).tz_convert(tz) if end_date else end_date
+        
+        query = self._pl.lazy().filter(date_col.is_not_null())
+        if start_date:
+            query = query.filter(date_col >= start_date)
+        if end_date:
+            query = query.filter(date_col <= end_date)
+        
+        aggregated = query.sort(self.date_column).group_by_dynamic(
+            self.date_column, every=every
+        ).agg([
+            value_col.sum().alias('total'),
+            value_col.mean().alias('media'),
+            value_col.count().cast(pl.Int64).alias('contagem')
+        ]).collect().to_pandas()
+        
+        if aggregated.empty:
+            return pd.DataFrame()
+        
+        # Completa períodos sem registros e rotula pelo fim do período, como o resample
+        # (colunas com fuso: períodos pela hora local, rótulos voltam ao fuso da coluna)
+        bins = aggregated[self.date_column]
+        if tz is not None:
+            bins = bins.dt.tz_localize(None)
+        periods = bins.dt.to_period(period_freq)
+        full_range = pd.period_range(periods.min(), periods.max(), freq=period_freq)
+        aggregated = aggregated.drop(columns=self.date_column).set_axis(periods).reindex(full_range)
+        aggregated = aggregated.fillna({'total': 0, 'contagem': 0}).astype({'contagem': 'int64'})
+        labels = full_range.end_time.normalize()
+        if tz is not None:
+            labels = labels.tz_localize(tz, ambiguous=True, nonexistent='shift_forward')
+        aggregated.insert(0, 'periodo', labels)
+        
+        return aggregated.reset_index(drop=True)
+    
+    @_cached_method
     def get_category_breakdown(self, 
                                category_column: Optional[str] = None,
                                top_n: int = 10) -> pd.DataFrame:
@@ -191,7 +439,7 @@ class MetricsCalculator:
             # Procura por colunas que parecem categorias
             cat_candidates = [col for col in self.df.columns 
                             if col not in [self.date_column, self.value_column] 
-                            and self.df[col].dtype == 'object']
+                            and is_text_dtype(self.df[col])]
             
             if cat_candidates:
                 category_column = cat_candidates[0]
@@ -201,17 +449,36 @@ class MetricsCalculator:
         if category_column not in self.df.columns:
             return pd.DataFrame()
         
-        # Agrupa por categoria
-        breakdown = self.df.groupby(category_column)[self.value_column].agg([
-            'sum', 'mean', 'count'
-        ]).reset_index()
+        pl_df = self._polars_frame()
+        if pl_df is not None:
+            value_col = pl.col(self.value_column)
+            breakdown = pl_df.lazy().filter(
+                pl.col(category_column).is_not_null()
+            ).group_by(category_column).agg([
+                value_col.sum().alias('total'),
+                value_col.mean().alias('media'),
+                value_col.count().cast(pl.Int64).alias('contagem')
+            ]).sort('total', descending=True).head(top_n).collect().to_pandas()
+            return breakdown.rename(columns={category_column: 'categoria'})
+        
+        # Agrupa por categoria: soma/contagem em uma passada cada (bincount)
+        # e a média sai de soma / contagem
+        categories, totals, counts = group_sum(self.df[category_column], self.df[self.value_column])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = totals / counts
         
-        breakdown.columns = ['categoria', 'total', 'media', 'contagem']
+        breakdown = pd.DataFrame({
+            'categoria': categories,
+            'total': totals,
+            'media': means,
+            'contagem': counts
+        })
         breakdown = breakdown.sort_values('total', ascending=False)
         
         # Retorna top N
         return breakdown.head(top_n)
     
+    @_cached_method
     def get_summary_kpis(self) -> Dict:
         """
         Retorna dicionário com todos os KPIs principais
@@ -232,21 +499,60 @@ class MetricsCalculator:
                    category_column: Optional[str] = None) -> 'MetricsCalculator':
         """
         Retorna nova instância com dados filtrados
+        A nova instância reaproveita a preparação desta (colunas identificadas
+        e datas ordenadas), sem repetir _prepare_data
         """
-        df_filtered = self.df.copy()
+        rows = slice(None)
+        mask = None
         
-        # Filtro de data
+        # Filtro de data: fatia contígua se as datas estiverem ordenadas
         if self.date_column and (start_date or end_date):
-            if start_date:
-                df_filtered = df_filtered[df_filtered[self.date_column] >= start_date]
-            if end_date:
-                df_filtered = df_filtered[df_filtered[self.date_column] <= end_date]
+            date_rows = self._date_slice(start_date, end_date)
+            if date_rows is not None:
+                rows = date_rows
+            else:
+                dates = self.df[self.date_column]
+                mask = np.ones(len(self.df), dtype=bool)
+                if start_date:
+                    mask &= (dates >= start_date).to_numpy()
+                if end_date:
+                    mask &= (dates <= end_date).to_numpy()
+        
+        df_filtered = self.df.iloc[rows]
         
         # Filtro de categoria
         if category_column and categories:
-            if category_column in df_filtered.columns:
-                df_filtered = df_filtered[df_filtered[category_column].isin(categories)]
+            if category_column in self.df.columns:
+                category_mask = df_filtered[category_column].isin(categories).to_numpy()
+                mask = category_mask if mask is None else mask & category_mask
+        
+        if mask is not None:
+            df_filtered = df_filtered[mask]
         
         # Retorna nova instância com dados filtrados
-        new_calculator = MetricsCalculator(df_filtered)
-        return new_calculator
+        return self._derive(df_filtered, rows, mask)
+    
+    def _derive(self,
+                df: pd.DataFrame,
+                rows: slice,
+                mask: Optional[np.ndarray]) -> 'MetricsCalculator':
+        """
+        Cria instância para um subconjunto das linhas (df.iloc[rows][mask])
+        Filtrar linhas não muda os tipos das colunas nem a ordem das datas
+        """
+        derived = MetricsCalculator.__new__(MetricsCalculator)
+        derived.df = df
+        derived.backend = self.backend
+        derived.value_column = self.value_column
+        derived.date_column = self.date_column
+        derived._reset_caches()
+        
+        if self._sorted_dates_cache is not None:
+            dates, values = self._sorted_dates_cache
+            dates, values = dates[rows], values[rows]
+            if mask is not None:
+                dates, values = dates[mask], values[mask]
+            derived._sorted_dates_checked = True
+            derived._sorted_dates_cache = (dates, values)
+        
+        return derived
@@ -5,12 +5,54 @@ Contém lógica de transformação e enriquecimento de dados
 
 import pandas as pd
 import numpy as np
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from datetime import datetime
+import calendar
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Nomes dos dias como em Series.dt.day_name() (segunda = 0)
+# Índice -1 (datas nulas) cai no último elemento: NaN
+_DAY_NAMES = np.array(['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday', np.nan],
+                      dtype=object)
+
+
+def _cumsum_and_rolling_mean(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcula soma acumulada e média móvel (min_periods=1) em uma única passada vetorizada
+    Nulos são ignorados como no pandas: o acumulado fica nulo na posição e
+    a média considera apenas valores válidos da janela
+    """
+    valid = ~np.isnan(values)
+    running_sum = np.cumsum(np.where(valid, values, 0.0))
+    running_count = np.cumsum(valid)
+    
+    # Soma/contagem da janela = acumulado atual - acumulado de `window` posições atrás
+    window_sum = running_sum.copy()
+    window_count = running_count.copy()
+    window_sum[window:] -= running_sum[:-window]
+    window_count[window:] -= running_count[:-window]
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        moving_avg = np.where(window_count > 0, window_sum / window_count, np.nan)
+    cumulative = np.where(valid, running_sum, np.nan)
+    
+    return cumulative, moving_avg
+
+
+def _quartiles(values: np.ndarray) -> Tuple[float, float]:
+    """
+    Retorna Q1 e Q3 de um array sem nulos com interpolação linear (como o pandas)
+    Usa np.partition (seleção O(n)) em vez de ordenar o array inteiro
+    """
+    positions = np.array([0.25, 0.75]) * (values.size - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.ceil(positions).astype(np.intp)
+    part = np.partition(values, np.unique(np.concatenate([lower, upper])))
+    q1, q3 = part[lower] + (part[upper] - part[lower]) * (positions - lower)
+    return q1, q3
+
 
 class DataProcessor:
     """
@@ -25,17 +67,22 @@ class DataProcessor:
         if date_column not in df.columns:
             return df
         
-        df_enriched = df.copy()
-        
-        # Extrai componentes de data
-        df_enriched['ano'] = df_enriched[date_column].dt.year
-        df_enriched['mes'] = df_enriched[date_column].dt.month
-        df_enriched['mes_nome'] = df_enriched[date_column].dt.strftime('%B')
-        df_enriched['trimestre'] = df_enriched[date_column].dt.quarter
-        df_enriched['semana'] = df_enriched[date_column].dt.isocalendar().week
-        df_enriched['dia_semana'] = df_enriched[date_column].dt.day_name()
+        # Um único DatetimeIndex: os componentes saem direto do buffer datetime64
+        dates = pd.DatetimeIndex(df[date_column])
+        month_codes = np.where(dates.isna(), -1, dates.month - 1).astype(np.int8)
+        day_codes = np.where(dates.isna(), -1, dates.dayofweek).astype(np.int8)
         
-        return df_enriched
+        # Nomes via tabela de consulta (mês segue o locale, como strftime('%B'))
+        # em vez de formatar linha a linha; o resultado continua texto, não Categorical
+        month_names = np.array(calendar.month_name[1:] + [np.nan], dtype=object)
+        return df.assign(
+            ano=dates.year,
+            mes=dates.month,
+            mes_nome=month_names[month_codes],
+            trimestre=dates.quarter,
+            semana=dates.isocalendar().week.array,
+            dia_semana=_DAY_NAMES[day_codes]
+        )
     
     @staticmethod
     def add_calculated_columns(df: pd.DataFrame, 
@@ -43,28 +90,41 @@ class DataProcessor:
         """
         Adiciona colunas calculadas úteis para análise
         """
-        df_calc = df.copy()
+        if value_column not in df.columns:
+            return df
         
-        if value_column not in df_calc.columns:
-            return df_calc
+        df_calc = df
         
         # Calcula percentual do total
         total = df_calc[value_column].sum()
         if total > 0:
-            df_calc[f'{value_column}_percentual'] = (
-                df_calc[value_column] / total * 100
-            )
+            df_calc = df_calc.assign(**{
+                f'{value_column}_percentual': df_calc[value_column] / total * 100
+            })
+        
+        # Ordena uma única vez por data (ordenação estável; pulada se já estiver ordenado)
+        has_date = 'data' in df_calc.columns
+        if has_date and not df_calc['data'].is_monotonic_increasing:
+            df_calc = df_calc.sort_values('data', kind='mergesort')
         
         # Calcula acumulado
-        df_calc = df_calc.sort_values('data') if 'data' in df_calc.columns else df_calc
-        df_calc[f'{value_column}_acumulado'] = df_calc[value_column].cumsum()
+        values = df_calc[value_column]
+        if not pd.api.types.is_numeric_dtype(values):
+            values = pd.to_numeric(values, errors='coerce')
+        cumulative, moving_avg = _cumsum_and_rolling_mean(
+            values.to_numpy(dtype=np.float64, na_value=np.nan), window=7
+        )
+        if pd.api.types.is_integer_dtype(values):
+            if isinstance(values.dtype, np.dtype):
+                cumulative = cumulative.astype(np.int64)
+            else:
+                # Inteiro nullable (Int64...): posições nulas continuam <NA>
+                cumulative = pd.array(cumulative, dtype='Int64')
+        df_calc = df_calc.assign(**{f'{value_column}_acumulado': cumulative})
         
         # Calcula média móvel (7 dias se tiver data)
-        if 'data' in df_calc.columns:
-            df_calc = df_calc.sort_values('data')
-            df_calc[f'{value_column}_media_movel'] = (
-                df_calc[value_column].rolling(window=7, min_periods=1).mean()
-            )
+        if has_date:
+            df_calc = df_calc.assign(**{f'{value_column}_media_movel': moving_avg})
         
         return df_calc
     
@@ -79,26 +139,28 @@ class DataProcessor:
         if column not in df.columns:
             return df
         
-        df_outliers = df.copy()
+        df_outliers = df
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = values[~np.isnan(values)]
         
         if method == 'iqr':
-            Q1 = df[column].quantile(0.25)
-            Q3 = df[column].quantile(0.75)
+            if valid.size == 0:
+                return df_outliers.assign(is_outlier=False)
+            
+            Q1, Q3 = _quartiles(valid)
             IQR = Q3 - Q1
             lower_bound = Q1 - 1.5 * IQR
             upper_bound = Q3 + 1.5 * IQR
             
-            df_outliers['is_outlier'] = (
-                (df_outliers[column] < lower_bound) |
-                (df_outliers[column] > upper_bound)
+            df_outliers = df_outliers.assign(
+                is_outlier=(values < lower_bound) | (values > upper_bound)
             )
         
         elif method == 'zscore':
-            mean = df[column].mean()
-            std = df[column].std()
+            std = valid.std(ddof=1) if valid.size > 1 else np.nan
             if std > 0:
-                df_outliers['zscore'] = abs((df_outliers[column] - mean) / std)
-                df_outliers['is_outlier'] = df_outliers['zscore'] > 3
+                zscore = np.abs((values - valid.mean()) / std)
+                df_outliers = df_outliers.assign(zscore=zscore, is_outlier=zscore > 3)
         
         return df_outliers
     
@@ -141,15 +203,15 @@ class DataProcessor:
         """
         Normaliza colunas numéricas (0-1)
         """
-        df_norm = df.copy()
+        normalized = {}
         
         for col in columns:
-            if col in df_norm.columns and pd.api.types.is_numeric_dtype(df_norm[col]):
-                min_val = df_norm[col].min()
-                max_val = df_norm[col].max()
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col]):
+                min_val = df[col].min()
+                max_val = df[col].max()
                 if max_val > min_val:
-                    df_norm[f'{col}_normalizado'] = (
-                        (df_norm[col] - min_val) / (max_val - min_val)
+                    normalized[f'{col}_normalizado'] = (
+                        (df[col] - min_val) / (max_val - min_val)
                     )
         
-        return df_norm
+        return df.assign(**normalized) if normalized else df
@@ -6,10 +6,23 @@ Utiliza Plotly para gráficos interativos
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+import numpy as np
 from typing import Optional, Dict, List
 from datetime import datetime
 
 from app.config.settings import COLORS, CHART_HEIGHT, CHART_TEMPLATE
+from app.utils.helpers import group_sum
+
+# Layout comum a todos os gráficos (montado uma vez na importação)
+_TITLE_FONT = dict(size=18, color=COLORS['text'])
+_BASE_LAYOUT = dict(
+    height=CHART_HEIGHT,
+    template=CHART_TEMPLATE,
+    margin=dict(l=20, r=20, t=60, b=40)
+)
+
+# Gradiente do ranking (do maior para o menor)
+_BLUES_REV = px.colors.sequential.Blues[::-1]
 
 
 def format_hours(decimal_hours: float) -> str:
@@ -25,6 +38,56 @@ def format_hours(decimal_hours: float) -> str:
     return f"{hours}:{minutes:02d}"
 
 
+def format_hours_series(values, na_rep: str = "0:00") -> List[str]:
+    """
+    Versão vetorizada de format_hours para vários valores de uma vez
+    Valores nulos viram na_rep ("0:00" por padrão)
+    Exemplo: [8.5, 7.25] -> ["8:30", "7:15"]
+    """
+    decimal_hours = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    is_null = np.isnan(decimal_hours)
+    decimal_hours = np.where(is_null, 0.0, decimal_hours)
+    
+    hours = decimal_hours.astype(np.int64)
+    minutes = ((decimal_hours - hours) * 60).astype(np.int64)
+    formatted = np.char.add(
+        np.char.add(hours.astype(str), ':'),
+        np.char.zfill(minutes.astype(str), 2)
+    )
+    
+    if na_rep != "0:00":
+        formatted = np.where(is_null, na_rep, formatted)
+    
+    return formatted.tolist()
+
+
+def format_number_series(values, na_rep: str = "") -> List[str]:
+    """
+    Formata vários valores com separador de milhar e 2 casas decimais
+    Valores nulos viram na_rep ("" por padrão)
+    Exemplo: [1234.5, None] -> ["1,234.50", ""]
+    """
+    numbers = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    fmt = '{:,.2f}'.format
+    # x == x é falso apenas para NaN
+    return [fmt(x) if x == x else na_rep for x in numbers.tolist()]
+
+
+def to_plot_array(series: pd.Series) -> np.ndarray:
+    """
+    Converte uma coluna em array NumPy contíguo para os traces do Plotly
+    Numéricos mantêm o tipo reduzido no carregamento (int8, int16...) e são
+    serializados como arrays tipados; nulos de tipos nullable viram NaN
+    """
+    if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy()
+    elif isinstance(series.dtype, np.dtype):
+        values = series.to_numpy()
+    else:
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.ascontiguousarray(values)
+
+
 def create_line_chart(df: pd.DataFrame,
                      x_column: str,
                      y_column: str,
@@ -36,12 +99,11 @@ def create_line_chart(df: pd.DataFrame,
     fig = go.Figure()
     
     if color and color in df.columns:
-        # Múltiplas linhas por categoria
-        for category in df[color].unique():
-            df_cat = df[df[color] == category]
+        # Múltiplas linhas por categoria (groupby particiona o DataFrame em uma passada)
+        for category, df_cat in df.groupby(color, observed=True, sort=False):
             fig.add_trace(go.Scatter(
-                x=df_cat[x_column],
-                y=df_cat[y_column],
+                x=to_plot_array(df_cat[x_column]),
+                y=to_plot_array(df_cat[y_column]),
                 mode='lines+markers',
                 name=str(category),
                 line=dict(width=2),
@@ -50,8 +112,8 @@ def create_line_chart(df: pd.DataFrame,
     else:
         # Linha única
         fig.add_trace(go.Scatter(
-            x=df[x_column],
-            y=df[y_column],
+            x=to_plot_array(df[x_column]),
+            y=to_plot_array(df[y_column]),
             mode='lines+markers',
             name=y_column,
             line=dict(color=COLORS['primary'], width=3),
@@ -59,15 +121,14 @@ def create_line_chart(df: pd.DataFrame,
         ))
     
     fig.update_layout(
+        _BASE_LAYOUT,
         title=dict(
             text=title,
-            font=dict(size=18, color=COLORS['text']),
+            font=_TITLE_FONT,
             x=0.5
         ),
         xaxis_title=x_column.title(),
         yaxis_title=y_column.title(),
-        height=CHART_HEIGHT,
-        template=CHART_TEMPLATE,
         hovermode='x unified',
         legend=dict(
             orientation="h",
@@ -75,8 +136,7 @@ def create_line_chart(df: pd.DataFrame,
             y=1.02,
             xanchor="right",
             x=1
-        ),
-        margin=dict(l=20, r=20, t=60, b=40)
+        )
     )
     
     return fig
@@ -108,27 +168,26 @@ def create_bar_chart(df: pd.DataFrame,
         )
     else:
         fig = go.Figure()
+        y_values = to_plot_array(df[y_col])
         fig.add_trace(go.Bar(
-            x=df[x_col],
-            y=df[y_col],
+            x=to_plot_array(df[x_col]),
+            y=y_values,
             marker_color=COLORS['primary'],
-            text=df[y_col],
+            text=y_values,
             textposition='auto',
             name=y_column
         ))
         fig.update_layout(title=title)
     
     fig.update_layout(
+        _BASE_LAYOUT,
         title=dict(
             text=title,
-            font=dict(size=18, color=COLORS['text']),
+            font=_TITLE_FONT,
             x=0.5
         ),
-        height=CHART_HEIGHT,
-        template=CHART_TEMPLATE,
         xaxis_title=x_col.title(),
         yaxis_title=y_col.title(),
-        margin=dict(l=20, r=20, t=60, b=40),
         showlegend=color_column is not None
     )
     
@@ -143,8 +202,8 @@ def create_pie_chart(df: pd.DataFrame,
     Cria gráfico de pizza
     """
     fig = go.Figure(data=[go.Pie(
-        labels=df[names_column],
-        values=df[values_column],
+        labels=to_plot_array(df[names_column]),
+        values=to_plot_array(df[values_column]),
         hole=0.4,  # Donut chart
         textinfo='label+percent',
         textposition='outside',
@@ -158,13 +217,12 @@ def create_pie_chart(df: pd.DataFrame,
     )])
     
     fig.update_layout(
+        _BASE_LAYOUT,
         title=dict(
             text=title,
-            font=dict(size=18, color=COLORS['text']),
+            font=_TITLE_FONT,
             x=0.5
         ),
-        height=CHART_HEIGHT,
-        template=CHART_TEMPLATE,
         margin=dict(l=20, r=20, t=60, b=20),
         showlegend=True,
         legend=dict(
@@ -189,8 +247,8 @@ def create_area_chart(df: pd.DataFrame,
     fig = go.Figure()
     
     fig.add_trace(go.Scatter(
-        x=df[x_column],
-        y=df[y_column],
+        x=to_plot_array(df[x_column]),
+        y=to_plot_array(df[y_column]),
         fill='tozeroy',
         mode='lines',
         name=y_column,
@@ -199,17 +257,15 @@ def create_area_chart(df: pd.DataFrame,
     ))
     
     fig.update_layout(
+        _BASE_LAYOUT,
         title=dict(
             text=title,
-            font=dict(size=18, color=COLORS['text']),
+            font=_TITLE_FONT,
             x=0.5
         ),
         xaxis_title=x_column.title(),
         yaxis_title=y_column.title(),
-        height=CHART_HEIGHT,
-        template=CHART_TEMPLATE,
-        hovermode='x unified',
-        margin=dict(l=20, r=20, t=60, b=40)
+        hovermode='x unified'
     )
     
     return fig
@@ -223,38 +279,39 @@ def create_heatmap(df: pd.DataFrame,
     """
     Cria mapa de calor
     """
-    # Cria tabela dinâmica
-    pivot = df.pivot_table(
-        index=y_column,
-        columns=x_column,
-        values=values_column,
-        aggfunc='sum',
-        fill_value=0
-    )
+    # Soma por par (linha, coluna) espalhada em uma grade NumPy zerada,
+    # sem passar pelo pivot_table; eixos em ordem crescente como no pivot
+    y_codes, y_labels = pd.factorize(df[y_column], sort=True)
+    x_codes, x_labels = pd.factorize(df[x_column], sort=True)
+    valid = (y_codes >= 0) & (x_codes >= 0)
+    values = df[values_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    
+    z = np.bincount(
+        y_codes[valid] * len(x_labels) + x_codes[valid],
+        weights=np.nan_to_num(values[valid]),
+        minlength=len(y_labels) * len(x_labels)
+    ).reshape(len(y_labels), len(x_labels))
     
     fig = go.Figure(data=go.Heatmap(
-        z=pivot.values,
-        x=pivot.columns,
-        y=pivot.index,
+        z=z,
+        x=x_labels,
+        y=y_labels,
         colorscale='Viridis',
-        text=pivot.values,
-        texttemplate='%{text:.0f}',
+        texttemplate='%{z:.0f}',
         textfont={"size": 10},
         hovertemplate='<b>%{y}</b> x <b>%{x}</b><br>' +
                       f'{values_column}: %{{z}}<extra></extra>'
     ))
     
     fig.update_layout(
+        _BASE_LAYOUT,
         title=dict(
             text=title,
-            font=dict(size=18, color=COLORS['text']),
+            font=_TITLE_FONT,
             x=0.5
         ),
-        height=CHART_HEIGHT,
-        template=CHART_TEMPLATE,
         xaxis_title=x_column.title(),
-        yaxis_title=y_column.title(),
-        margin=dict(l=20, r=20, t=60, b=40)
+        yaxis_title=y_column.title()
     )
     
     return fig
@@ -269,34 +326,35 @@ def create_ranking_chart(df: pd.DataFrame,
     """
     Cria gráfico de ranqueamento (ranking) dos top N
     """
-    # Garante que a coluna de valor seja numérica antes de fazer operações
-    df_copy = df.copy()
-    if not pd.api.types.is_numeric_dtype(df_copy[value_column]):
-        df_copy[value_column] = pd.to_numeric(df_copy[value_column], errors='coerce')
-    
-    # Agrupa por categoria e soma valores
-    ranking = df_copy.groupby(category_column)[value_column].sum().reset_index()
-    ranking.columns = ['categoria', 'total']
+    # Garante que a coluna de valor seja numérica (converte só essa coluna, sem copiar o DataFrame)
+    values = df[value_column]
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values, errors='coerce')
     
-    # Ordena por total (maior para menor)
-    ranking = ranking.sort_values('total', ascending=(orientation == 'h'))
+    # Soma por categoria (factorize + bincount) e seleciona o top N
+    # (maior para menor) sem ordenar todos os grupos
+    groups, group_totals, _ = group_sum(df[category_column], values)
+    top = np.arange(len(group_totals))
+    if len(group_totals) > top_n:
+        top = np.sort(np.argpartition(-group_totals, top_n)[:top_n])
+    top = top[np.argsort(-group_totals[top], kind='stable')]
     
-    # Top N
-    ranking = ranking.head(top_n)
+    categories = np.asarray(groups.take(top))
+    totals = group_totals[top]
     
     # Cria cores gradientes (do maior para o menor)
-    colors = px.colors.sequential.Blues[::-1][:len(ranking)]
+    colors = _BLUES_REV[:len(totals)]
     
     if orientation == 'h':
         fig = go.Figure(data=[go.Bar(
-            x=ranking['total'],
-            y=ranking['categoria'],
+            x=totals,
+            y=categories,
             orientation='h',
             marker=dict(
                 color=colors,
                 line=dict(color='#FFFFFF', width=1)
             ),
-            text=ranking['total'],
+            text=totals,
             textposition='auto',
             texttemplate='%{text:,.0f}',
             hovertemplate='<b>%{y}</b><br>' +
@@ -304,27 +362,25 @@ def create_ranking_chart(df: pd.DataFrame,
         )])
         
         fig.update_layout(
+            _BASE_LAYOUT,
             title=dict(
                 text=title,
-                font=dict(size=18, color=COLORS['text']),
+                font=_TITLE_FONT,
                 x=0.5
             ),
             xaxis_title=value_column.title(),
             yaxis_title=category_column.title(),
-            height=CHART_HEIGHT,
-            template=CHART_TEMPLATE,
-            margin=dict(l=20, r=20, t=60, b=40),
             yaxis=dict(autorange='reversed')  # Inverte para maior no topo
         )
     else:
         fig = go.Figure(data=[go.Bar(
-            x=ranking['categoria'],
-            y=ranking['total'],
+            x=categories,
+            y=totals,
             marker=dict(
                 color=colors,
                 line=dict(color='#FFFFFF', width=1)
             ),
-            text=ranking['total'],
+            text=totals,
             textposition='auto',
             texttemplate='%{text:,.0f}',
             hovertemplate='<b>%{x}</b><br>' +
@@ -332,16 +388,14 @@ def create_ranking_chart(df: pd.DataFrame,
         )])
         
         fig.update_layout(
+            _BASE_LAYOUT,
             title=dict(
                 text=title,
-                font=dict(size=18, color=COLORS['text']),
+                font=_TITLE_FONT,
                 x=0.5
             ),
             xaxis_title=category_column.title(),
             yaxis_title=value_column.title(),
-            height=CHART_HEIGHT,
-            template=CHART_TEMPLATE,
-            margin=dict(l=20, r=20, t=60, b=40),
             xaxis=dict(tickangle=-45)
         )
     
@@ -360,18 +414,15 @@ def create_table(df: pd.DataFrame,
     # Formata coluna orh para horas (HH:MM)
     for col in df_display.columns:
         if 'orh' in str(col).lower():
-            # Garante que a coluna seja numérica antes de formatar
-            df_display[col] = pd.to_numeric(df_display[col], errors='coerce')
-            df_display[col] = df_display[col].apply(format_hours)
+            # Converte para numérico e formata a coluna inteira de uma vez
+            df_display[col] = format_hours_series(df_display[col], na_rep="")
     
     # Formata colunas numéricas
     numeric_cols = df_display.select_dtypes(include=['number']).columns
     for col in numeric_cols:
         # Pula coluna orh se já foi formatada
         if 'orh' not in str(col).lower():
-            df_display[col] = df_display[col].apply(
-                lambda x: f"{x:,.2f}" if pd.notna(x) else ""
-            )
+            df_display[col] = format_number_series(df_display[col])
     
     # Formata datas
     date_cols = df_display.select_dtypes(include=['datetime64']).columns
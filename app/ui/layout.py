@@ -3,17 +3,15 @@ Módulo de layout e estrutura visual do dashboard
 Define a estrutura geral e componentes visuais
 """
 
+import functools
 import streamlit as st
 from typing import Dict, Optional
 from pathlib import Path
-from app.config.settings import COLORS
+from app.config.settings import COLORS, COMPANY_NAME, COMPANY_LOGO_PATH, BASE_DIR
+from app.utils.helpers import BR_SEPARATORS
 
-
-def apply_custom_css():
-    """
-    Aplica CSS customizado para design moderno
-    """
-    st.markdown("""
+# CSS customizado montado uma única vez na importação do módulo
+_CUSTOM_CSS = """
     <style>
         /* Estilo geral */
         .main {
@@ -68,6 +66,19 @@ def apply_custom_css():
             color: #d62728;
         }
         
+        /* Grade dos cards de KPI (número de colunas em --kpi-columns) */
+        .kpi-grid {
+            display: grid;
+            grid-template-columns: repeat(var(--kpi-columns, 4), minmax(0, 1fr));
+            column-gap: 1rem;
+        }
+        
+        @media (max-width: 640px) {
+            .kpi-grid {
+                grid-template-columns: minmax(0, 1fr);
+            }
+        }
+        
         /* Título principal */
         h1 {
             color: #212529;
@@ -149,29 +160,72 @@ def apply_custom_css():
             background: #555;
         }
     </style>
-    """, unsafe_allow_html=True)
+    """
+
+# Nome da empresa exibido no cabeçalho quando não há logo
+_COMPANY_TEMPLATE = f"""
+            <div style="text-align: right; padding: 1rem 0;">
+                <h3 style="color: {COLORS['primary']}; margin: 0; font-weight: 600;">
+                    {{company}}
+                </h3>
+            </div>
+            """
+
+# Templates HTML dos cards de KPI (ver _render_card)
+_CARD_TEMPLATE = """
+                <div class="metric-card">
+                    <h3>{label}</h3>
+                    <p class="value">{value}</p>
+                </div>
+                """
+
+_CARD_CHANGE_TEMPLATE = """
+                <div class="metric-card">
+                    <h3>{label}</h3>
+                    <p class="value">{value}</p>
+                    <p class="change {change_class}">
+                        {change_icon} {change_percent:.2f}% 
+                        ({sign}{change:,.2f})
+                    </p>
+                </div>
+                """
+
+# Abreviações de KPI, da maior para a menor magnitude
+_KPI_SUFFIXES = ((1_000_000, 'M'), (1_000, 'K'))
+
+
+def apply_custom_css():
+    """
+    Aplica CSS customizado para design moderno
+    Chamada uma vez por execução, no início do app (main.py)
+    """
+    st.markdown(_CUSTOM_CSS, unsafe_allow_html=True)
+
+
+@functools.lru_cache(maxsize=8)
+def _resolve_logo(logo) -> Optional[str]:
+    """
+    Resolve o caminho do logo (relativo ao BASE_DIR) e verifica se o arquivo existe
+    Resultado em cache: evita Path/stat a cada rerun
+    Retorna o caminho como string ou None se não houver logo
+    """
+    if not logo:
+        return None
+    
+    logo = Path(logo)
+    if not logo.is_absolute():
+        logo = BASE_DIR / logo
+    
+    return str(logo) if logo.exists() else None
 
 
 def render_header(title: str = "Dashboard Analytics", company_name: str = None, logo_path: str = None):
     """
     Renderiza cabeçalho do dashboard com marca da empresa no canto superior
     """
-    from app.config.settings import COMPANY_NAME, COMPANY_LOGO_PATH, BASE_DIR
-    
     # Usa configurações padrão se não fornecidas
     company = company_name or COMPANY_NAME
-    logo = logo_path or COMPANY_LOGO_PATH
-    
-    # Converte logo para Path se for string
-    if logo and isinstance(logo, str):
-        # Se for caminho relativo, usa BASE_DIR
-        if not Path(logo).is_absolute():
-            logo = BASE_DIR / logo
-        else:
-            logo = Path(logo)
-    elif logo and not isinstance(logo, Path):
-        # Garante que seja Path
-        logo = Path(logo) if logo else None
+    logo_path_str = _resolve_logo(logo_path or COMPANY_LOGO_PATH)
     
     # Header com marca no canto superior direito
     col1, col2 = st.columns([3, 1])
@@ -180,92 +234,94 @@ def render_header(title: str = "Dashboard Analytics", company_name: str = None,
         st.title(f" {title}")
     
     with col2:
-        # Verifica se existe logo e exibe
-        logo_path_str = None
-        if logo and isinstance(logo, Path):
-            if logo.exists():
-                logo_path_str = str(logo)
-        
         if logo_path_str:
             st.image(logo_path_str, width=250)
         else:
             # Se não houver logo, exibe nome da empresa estilizado
-            st.markdown(f"""
-            <div style="text-align: right; padding: 1rem 0;">
-                <h3 style="color: {COLORS['primary']}; margin: 0; font-weight: 600;">
-                    {company}
-                </h3>
-            </div>
-            """, unsafe_allow_html=True)
+            st.markdown(_COMPANY_TEMPLATE.format(company=company), unsafe_allow_html=True)
     
     st.markdown("---")
 
 
+def _format_kpi_value(value, prefix: str = "") -> str:
+    """
+    Formata valor de KPI: milhões/milhares abreviados (M/K) e demais valores
+    com separadores brasileiros (1.234,56)
+    """
+    if not isinstance(value, (int, float)):
+        return str(value)
+    
+    magnitude = abs(value)
+    for threshold, suffix in _KPI_SUFFIXES:
+        if magnitude >= threshold:
+            return f"{prefix}{value/threshold:.2f}{suffix}"
+    return prefix + f"{value:,.2f}".translate(BR_SEPARATORS)
+
+
+def _render_scalar_card(label: str, value) -> str:
+    """
+    Monta o HTML de um card de KPI simples
+    """
+    return _CARD_TEMPLATE.format(label=label, value=_format_kpi_value(value))
+
+
+def _render_dict_card(label: str, value: Dict) -> str:
+    """
+    Monta o HTML de um card de KPI com variação
+    value: dict com 'value' e, opcionalmente, 'change' e 'change_percent'
+    """
+    change = value.get('change', 0)
+    positive = change >= 0
+    return _CARD_CHANGE_TEMPLATE.format(
+        label=label,
+        value=_format_kpi_value(value.get('value', 0), prefix="R$ "),
+        change_class="positive" if positive else "negative",
+        change_icon="📈" if positive else "📉",
+        change_percent=abs(value.get('change_percent', 0)),
+        sign='+' if positive else '',
+        change=change
+    )
+
+
+def _render_card(label: str, value) -> str:
+    """
+    Monta o HTML de um card de KPI
+    value pode ser um valor simples ou um dict com 'value', 'change' e 'change_percent'
+    """
+    if isinstance(value, dict):
+        return _render_dict_card(label, value)
+    return _render_scalar_card(label, value)
+
+
+def _card_renderer(kpis: Dict):
+    """
+    Escolhe uma vez o renderizador dos cards conforme o formato dos KPIs
+    (todos dict, todos simples ou misturados)
+    """
+    is_dict = [isinstance(value, dict) for value in kpis.values()]
+    if all(is_dict):
+        return _render_dict_card
+    if not any(is_dict):
+        return _render_scalar_card
+    return _render_card
+
+
 def render_kpi_cards(kpis: Dict, columns_per_row: int = 4):
     """
     Renderiza cards de KPI no topo do dashboard
+    Todos os cards vão em um único st.markdown, dispostos pela grade .kpi-grid
+    O CSS dos cards vem de apply_custom_css, aplicado no início do app
     """
-    apply_custom_css()
+    num_cols = min(columns_per_row, len(kpis))
     
-    # Divide KPIs em colunas
-    kpi_items = list(kpis.items())
-    num_cols = min(columns_per_row, len(kpi_items))
+    # Sem linhas em branco no HTML: o markdown trata o bloco inteiro como HTML
+    parts = [f'<div class="kpi-grid" style="--kpi-columns: {num_cols};">']
+    render_card = _card_renderer(kpis)
+    for label, value in kpis.items():
+        parts.append(render_card(label, value).strip())
+    parts.append('</div>')
     
-    cols = st.columns(num_cols)
-    
-    for idx, (label, value) in enumerate(kpi_items):
-        col_idx = idx % num_cols
-        with cols[col_idx]:
-            # Formata valor
-            if isinstance(value, dict):
-                # KPI com variação
-                main_value = value.get('value', 0)
-                change = value.get('change', 0)
-                change_percent = value.get('change_percent', 0)
-                
-                # Formata número
-                if isinstance(main_value, (int, float)):
-                    if abs(main_value) >= 1000000:
-                        formatted_value = f"R$ {main_value/1000000:.2f}M"
-                    elif abs(main_value) >= 1000:
-                        formatted_value = f"R$ {main_value/1000:.2f}K"
-                    else:
-                        formatted_value = f"R$ {main_value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                else:
-                    formatted_value = str(main_value)
-                
-                # Determina cor da variação
-                change_class = "positive" if change >= 0 else "negative"
-                change_icon = "📈" if change >= 0 else "📉"
-                
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>{label}</h3>
-                    <p class="value">{formatted_value}</p>
-                    <p class="change {change_class}">
-                        {change_icon} {abs(change_percent):.2f}% 
-                        ({'+' if change >= 0 else ''}{change:,.2f})
-                    </p>
-                </div>
-                """, unsafe_allow_html=True)
-            else:
-                # KPI simples
-                if isinstance(value, (int, float)):
-                    if abs(value) >= 1000000:
-                        formatted_value = f"{value/1000000:.2f}M"
-                    elif abs(value) >= 1000:
-                        formatted_value = f"{value/1000:.2f}K"
-                    else:
-                        formatted_value = f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
-                else:
-                    formatted_value = str(value)
-                
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>{label}</h3>
-                    <p class="value">{formatted_value}</p>
-                </div>
-                """, unsafe_allow_html=True)
+    st.markdown("\n".join(parts), unsafe_allow_html=True)
 
 
 def render_section_title(title: str, icon: str = "📈"):
@@ -3,17 +3,32 @@ Módulo de sidebar e filtros
 Implementa todos os controles de filtragem do dashboard
 """
 
+import re
 import streamlit as st
 import pandas as pd
+import numpy as np
 from typing import Optional, List, Tuple
 from datetime import datetime, date
 
 from app.config.settings import COLORS
+from app.utils.helpers import is_text_dtype
 
+# Palavras que indicam coluna de categoria (uma única busca por regex por coluna)
+_CATEGORY_KEYWORDS = ['categoria', 'category', 'tipo', 'status',
+                     'segmento', 'grupo', 'classe', 'classificacao']
+_CATEGORY_KEYWORDS_RE = re.compile('|'.join(_CATEGORY_KEYWORDS))
 
-def render_sidebar(df: pd.DataFrame) -> dict:
+# Chaves de session_state dos widgets de filtro (limpas pelo botão de reset)
+_FILTER_KEY_PREFIXES = ('filter_', 'value_range', 'date_range')
+
+
+def render_sidebar(df: pd.DataFrame, numeric_columns: Optional[List[str]] = None,
+                   data_version: Optional[float] = None) -> dict:
     """
     Renderiza sidebar com filtros e retorna dicionário com valores selecionados
+    numeric_columns: colunas numéricas já conhecidas (evita varrer os tipos a cada rerun)
+    data_version: identificador do dataset carregado (mtime do Excel); habilita o cache
+    das colunas de categoria e suas opções entre reruns
     """
     st.sidebar.title("🔍 Filtros")
     st.sidebar.markdown("---")
@@ -24,8 +39,10 @@ def render_sidebar(df: pd.DataFrame) -> dict:
     if 'data' in df.columns:
         dates = df['data'].dropna()
         if len(dates) > 0:
-            min_date = dates.min().date() if hasattr(dates.min(), 'date') else dates.min()
-            max_date = dates.max().date() if hasattr(dates.max(), 'date') else dates.max()
+            # Cada agregação uma única vez; Timestamp vira date para o date_input
+            min_date, max_date = dates.min(), dates.max()
+            if isinstance(min_date, pd.Timestamp):
+                min_date, max_date = min_date.date(), max_date.date()
             
             st.sidebar.subheader("📅 Período")
             
@@ -51,13 +68,15 @@ def render_sidebar(df: pd.DataFrame) -> dict:
                 )
     
     # Filtro de categoria
-    category_columns = _find_category_columns(df)
-    if category_columns:
+    if data_version is None:
+        category_options = _category_options(df)
+    else:
+        category_options = _cached_category_options(df, data_version)
+    if category_options:
         st.sidebar.markdown("---")
         st.sidebar.subheader("📂 Categorias")
         
-        for col in category_columns[:3]:  # Limita a 3 colunas de categoria
-            unique_values = sorted(df[col].dropna().unique().tolist())
+        for col, unique_values in category_options:
             if len(unique_values) > 0 and len(unique_values) <= 50:
                 selected = st.sidebar.multiselect(
                     f"**{col.title()}**",
@@ -69,14 +88,15 @@ def render_sidebar(df: pd.DataFrame) -> dict:
                     filters[f'category_{col}'] = selected
     
     # Filtro de valores (range slider)
-    numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
+    if numeric_columns is None:
+        numeric_columns = df.select_dtypes(include=['number']).columns.tolist()
     if numeric_columns:
         st.sidebar.markdown("---")
         st.sidebar.subheader("💰 Valores")
         
         main_value_col = numeric_columns[0]
-        min_val = float(df[main_value_col].min())
-        max_val = float(df[main_value_col].max())
+        values = df[main_value_col]
+        min_val, max_val = float(values.min()), float(values.max())
         
         value_range = st.sidebar.slider(
             f"**{main_value_col.title()}**",
@@ -86,23 +106,29 @@ def render_sidebar(df: pd.DataFrame) -> dict:
             key="value_range"
         )
         filters['value_range'] = value_range
+        filters['value_column'] = main_value_col
     
     # Botão de reset
     st.sidebar.markdown("---")
-    if st.sidebar.button("🔄 Resetar Filtros", width='stretch'):
-        st.session_state.clear()
-        st.rerun()
+    st.sidebar.button("🔄 Resetar Filtros", width='stretch', on_click=_reset_filters)
     
     return filters
 
 
+def _reset_filters():
+    """
+    Remove apenas o estado dos widgets de filtro
+    Roda como callback antes do rerun do clique, dispensando um st.rerun extra
+    """
+    for key in list(st.session_state.keys()):
+        if key.startswith(_FILTER_KEY_PREFIXES):
+            del st.session_state[key]
+
+
 def _find_category_columns(df: pd.DataFrame) -> List[str]:
     """
     Identifica colunas que parecem ser categorias
     """
-    category_keywords = ['categoria', 'category', 'tipo', 'status', 
-                        'segmento', 'grupo', 'classe', 'classificacao']
-    
     category_cols = []
     
     # Procura por colunas de texto com poucos valores únicos
@@ -113,46 +139,68 @@ def _find_category_columns(df: pd.DataFrame) -> List[str]:
         col_lower = str(col).lower()
         
         # Se contém palavra-chave de categoria
-        if any(keyword in col_lower for keyword in category_keywords):
+        if _CATEGORY_KEYWORDS_RE.search(col_lower) is not None:
             category_cols.append(col)
         # Se é texto e tem poucos valores únicos (provavelmente categoria)
-        elif df[col].dtype == 'object':
+        elif is_text_dtype(df[col]):
             unique_count = df[col].nunique()
-            total_count = len(df[col].dropna())
+            total_count = df[col].count()
             if total_count > 0 and (unique_count / total_count) < 0.3 and unique_count <= 50:
                 category_cols.append(col)
     
     return category_cols
 
 
+def _category_options(df: pd.DataFrame) -> List[Tuple[str, list]]:
+    """
+    Colunas de categoria (até 3) com seus valores únicos ordenados, sem nulos
+    """
+    return [
+        (col, sorted(df[col].dropna().unique().tolist()))
+        for col in _find_category_columns(df)[:3]  # Limita a 3 colunas de categoria
+    ]
+
+
+@st.cache_data(show_spinner=False)
+def _cached_category_options(_df: pd.DataFrame, data_version: float) -> List[Tuple[str, list]]:
+    """
+    _category_options em cache pela versão do dataset
+    O DataFrame (prefixo _) não entra na chave: o hash do Streamlit amostra frames
+    grandes e poderia reaproveitar opções de um arquivo recarregado
+    """
+    return _category_options(_df)
+
+
 def apply_filters(df: pd.DataFrame, filters: dict) -> pd.DataFrame:
     """
     Aplica filtros ao DataFrame
+    Todos os filtros são combinados em uma única máscara, aplicada uma vez no final
     """
-    df_filtered = df.copy()
+    mask = np.ones(len(df), dtype=bool)
     
     # Filtro de data
-    if 'start_date' in filters and 'data' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['data'] >= filters['start_date']]
-    
-    if 'end_date' in filters and 'data' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['data'] <= filters['end_date']]
+    if 'data' in df.columns:
+        if 'start_date' in filters:
+            mask &= (df['data'] >= filters['start_date']).to_numpy()
+        if 'end_date' in filters:
+            mask &= (df['data'] <= filters['end_date']).to_numpy()
     
     # Filtro de categoria
     for key, value in filters.items():
         if key.startswith('category_'):
             col = key.replace('category_', '')
-            if col in df_filtered.columns and value:
-                df_filtered = df_filtered[df_filtered[col].isin(value)]
+            if col in df.columns and value:
+                mask &= df[col].isin(set(value)).to_numpy()
     
     # Filtro de valores
     if 'value_range' in filters:
-        numeric_cols = df_filtered.select_dtypes(include=['number']).columns.tolist()
-        if numeric_cols:
+        value_col = filters.get('value_column')
+        if value_col is None:
+            numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+            value_col = numeric_cols[0] if numeric_cols else None
+        if value_col in df.columns:
             min_val, max_val = filters['value_range']
-            df_filtered = df_filtered[
-                (df_filtered[numeric_cols[0]] >= min_val) &
-                (df_filtered[numeric_cols[0]] <= max_val)
-            ]
+            values = df[value_col]
+            mask &= ((values >= min_val) & (values <= max_val)).to_numpy()
     
-    return df_filtered
+    return df[mask]
@@ -3,9 +3,37 @@ Funções auxiliares reutilizáveis
 """
 
 import pandas as pd
+import numpy as np
 import re
-from typing import Optional, List, Any
-from datetime import datetime
+from typing import Optional, List, Any, Tuple
+from datetime import datetime, date
+
+
+# Formatos de data já cobertos pela passada ISO8601 do pandas
+ISO_DATE_FORMATS = {'%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S'}
+
+# Textos aceitos pela passada ISO8601: data completa (ano-mês-dia), com hora opcional
+# Evita que anos soltos ("2023") ou ano-mês virem datas
+_ISO_DATE_PREFIX = re.compile(r'\d{4}-\d{2}-\d{2}(?:[ T]|$)')
+
+# Tabela de acentos removidos por normalize_column_name (uma única passada com translate)
+_ACCENT_TABLE = str.maketrans({
+    'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
+    'é': 'e', 'ê': 'e',
+    'í': 'i',
+    'ó': 'o', 'ô': 'o', 'õ': 'o',
+    'ú': 'u', 'ü': 'u',
+    'ç': 'c'
+})
+
+_NON_ALNUM = re.compile(r'[^a-z0-9_]')
+_MULTI_UNDERSCORE = re.compile(r'_+')
+
+# Troca separadores do formato americano (1,234.56) para o brasileiro (1.234,56)
+BR_SEPARATORS = str.maketrans({',': '.', '.': ','})
+
+# Caracteres removidos por safe_convert_numeric_series
+_NUMERIC_CLEAN = re.compile(r'[^\d\.\-]')
 
 
 def normalize_column_name(col: str) -> str:
@@ -19,23 +47,9 @@ def normalize_column_name(col: str) -> str:
     # Converte para string e minúsculas
     col = str(col).lower().strip()
     
-    # Remove acentos básicos
-    replacements = {
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a',
-        'é': 'e', 'ê': 'e',
-        'í': 'i',
-        'ó': 'o', 'ô': 'o', 'õ': 'o',
-        'ú': 'u', 'ü': 'u',
-        'ç': 'c'
-    }
-    for old, new in replacements.items():
-        col = col.replace(old, new)
-    
-    # Remove caracteres especiais e espaços
-    col = re.sub(r'[^a-z0-9_]', '_', col)
-    
-    # Remove underscores múltiplos
-    col = re.sub(r'_+', '_', col)
+    # Remove acentos básicos, caracteres especiais e underscores repetidos
+    col = col.translate(_ACCENT_TABLE)
+    col = _MULTI_UNDERSCORE.sub('_', _NON_ALNUM.sub('_', col))
     
     # Remove underscores no início/fim
     col = col.strip('_')
@@ -43,6 +57,26 @@ def normalize_column_name(col: str) -> str:
     return col if col else "unnamed"
 
 
+def normalize_columns(columns) -> pd.Index:
+    """
+    Normaliza todos os nomes de colunas de uma vez (ver normalize_column_name)
+    Cabeçalhos têm poucas dezenas de nomes: o laço sobre strings Python é mais
+    rápido que uma cadeia de operações .str do pandas
+    """
+    return pd.Index([normalize_column_name(col) for col in columns])
+
+
+def is_text_dtype(series: pd.Series) -> bool:
+    """
+    Indica se a coluna é textual (object, string ou category)
+    """
+    return (
+        pd.api.types.is_object_dtype(series)
+        or pd.api.types.is_string_dtype(series)
+        or isinstance(series.dtype, pd.CategoricalDtype)
+    )
+
+
 def safe_convert_date(date_value: Any, formats: List[str]) -> Optional[datetime]:
     """
     Tenta converter um valor para data usando múltiplos formatos
@@ -69,6 +103,58 @@ def safe_convert_date(date_value: Any, formats: List[str]) -> Optional[datetime]
     return None
 
 
+def convert_date_series(series: pd.Series, formats: List[str]) -> pd.Series:
+    """
+    Converte uma Series inteira para data
+    Versão vetorizada de safe_convert_date: valores não convertidos viram NaT
+    Faz uma passada ISO8601 (textos ano-mês-dia e objetos de data) e só tenta os
+    demais formatos nos valores que sobraram
+    Colunas numéricas (ex.: ano) não são tratadas como data
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return parsed
+    
+    # Remove espaços das strings mantendo valores que já são datas
+    iso_mask = np.zeros(len(series), dtype=bool)
+    try:
+        stripped = series.str.strip()
+        series = stripped.where(stripped.notna(), series)
+        iso_mask = series.str.match(_ISO_DATE_PREFIX).to_numpy(dtype=bool, na_value=False)
+        non_text = (series.notna() & stripped.isna()).to_numpy()
+    except AttributeError:
+        non_text = series.notna().to_numpy()  # Sem strings na coluna
+    
+    # Valores que já são datas (datetime/date) também entram na passada ISO8601
+    if non_text.any():
+        positions = np.flatnonzero(non_text)
+        is_date = series.iloc[positions].map(lambda value: isinstance(value, (datetime, date)))
+        iso_mask[positions[is_date.to_numpy(dtype=bool)]] = True
+    
+    if iso_mask.any():
+        # utc=True aceita datas com e sem fuso; o resultado volta a ser "naive"
+        iso = pd.to_datetime(series[iso_mask], errors='coerce', format='ISO8601', utc=True)
+        parsed.iloc[np.flatnonzero(iso_mask)] = iso.dt.tz_localize(None).to_numpy()
+    
+    # Posições ainda sem data: cada formato só é tentado nelas e o conjunto
+    # encolhe a cada formato (sem recalcular máscaras na coluna inteira)
+    pending = np.flatnonzero((parsed.isna() & series.notna()).to_numpy())
+    for fmt in formats:
+        if fmt in ISO_DATE_FORMATS:
+            continue
+        if pending.size == 0:
+            break
+        converted = pd.to_datetime(series.iloc[pending], errors='coerce', format=fmt, cache=True)
+        hit = converted.notna().to_numpy()
+        parsed.iloc[pending[hit]] = converted[hit].to_numpy()
+        pending = pending[~hit]
+    
+    return parsed
+
+
 def safe_convert_numeric(value: Any) -> Optional[float]:
     """
     Converte valor para numérico de forma segura
@@ -92,21 +178,91 @@ def safe_convert_numeric(value: Any) -> Optional[float]:
     return None
 
 
+def safe_convert_numeric_series(series: pd.Series) -> pd.Series:
+    """
+    Versão vetorizada de safe_convert_numeric para uma Series inteira
+    Textos passam pela mesma limpeza (vírgula vira ponto, demais caracteres
+    removidos) em operações .str; números (int/float) são mantidos e os demais
+    valores (datas, objetos) ou textos inválidos viram NaN
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype('float64')
+    
+    if isinstance(series.dtype, pd.StringDtype):
+        is_text = series.notna().to_numpy()
+        is_number = np.zeros(len(series), dtype=bool)
+    else:
+        # Coluna object/categoria: classifica cada valor pelo tipo, como a versão escalar
+        kinds = series.astype(object).map(
+            lambda value: 1 if isinstance(value, str) else 2 if isinstance(value, (int, float)) else 0
+        ).to_numpy()
+        is_text = kinds == 1
+        is_number = kinds == 2
+    
+    converted = pd.Series(np.nan, index=series.index, dtype='float64')
+    if is_text.any():
+        text = series[is_text].astype(str)
+        cleaned = text.str.replace(',', '.', regex=False).str.strip().str.replace(_NUMERIC_CLEAN, '', regex=True)
+        converted[is_text] = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    if is_number.any():
+        converted[is_number] = series[is_number].astype(object).astype('float64').to_numpy()
+    return converted
+
+
+def convert_numeric_series(series: pd.Series) -> pd.Series:
+    """
+    Converte uma Series inteira para numérico
+    Usa pd.to_numeric e só recorre a safe_convert_numeric_series nos valores que falharam
+    (ex.: "R$ 1.000,50")
+    """
+    converted = pd.to_numeric(series, errors='coerce')
+    
+    # Colunas string devolvem tipos anuláveis (Int64/Float64): volta para NumPy
+    if isinstance(converted.dtype, pd.api.extensions.ExtensionDtype):
+        has_na = converted.isna().any()
+        converted = converted.astype('float64' if has_na else converted.dtype.numpy_dtype)
+    
+    failed = converted.isna() & series.notna()
+    if failed.any():
+        converted = converted.astype('float64')
+        converted.loc[failed] = safe_convert_numeric_series(series[failed])
+    
+    return converted
+
+
+def group_sum(keys: pd.Series, values: pd.Series) -> Tuple[Any, np.ndarray, np.ndarray]:
+    """
+    Soma e conta os valores não nulos por grupo (pd.factorize + np.bincount)
+    Grupos na ordem de aparição; chaves nulas são ignoradas
+    Retorna: (grupos, somas, contagens)
+    """
+    codes, groups = pd.factorize(keys, sort=False)
+    values_np = values.to_numpy(dtype=np.float64, na_value=np.nan)
+    valid = (codes >= 0) & ~np.isnan(values_np)
+    
+    sums = np.bincount(codes[valid], weights=values_np[valid], minlength=len(groups))
+    counts = np.bincount(codes[valid], minlength=len(groups)).astype(np.int64)
+    if values.dtype.kind in 'iu':
+        sums = sums.astype(np.int64)
+    
+    return groups, sums, counts
+
+
 def format_currency(value: float, currency: str = "R$") -> str:
     """
     Formata valor como moeda
     """
-    if value is None or pd.isna(value):
+    if pd.isna(value):
         return f"{currency} 0,00"
     
-    return f"{currency} {value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+    return f"{currency} {value:,.2f}".translate(BR_SEPARATORS)
 
 
 def format_percentage(value: float, decimals: int = 2) -> str:
     """
     Formata valor como percentual
     """
-    if value is None or pd.isna(value):
+    if pd.isna(value):
         return "0,00%"
     
     return f"{value:.{decimals}f}%".replace('.', ',')
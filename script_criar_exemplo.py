@@ -25,14 +25,14 @@ dados_exemplo = {
 }
 
 # Cria DataFrame
-"""""
 df = pd.DataFrame(dados_exemplo)
 
-# Salva como Excel
+# Salva como Excel (um único ExcelWriter para todas as abas)
 arquivo_exemplo = Path('modelo Power BI - exemplo.xlsx')
-df.to_excel(arquivo_exemplo, index=False, sheet_name='performance - 2022-12-02T105208')
+with pd.ExcelWriter(arquivo_exemplo, engine='openpyxl') as writer:
+    df.to_excel(writer, index=False, sheet_name='performance - 2022-12-02T105208')
 
 print(f"Arquivo de exemplo criado: {arquivo_exemplo}")
 print(f"Total de linhas: {len(df)}")
 print(f"Colunas: {', '.join(df.columns.tolist())}")
-"""
\ No newline at end of file
+
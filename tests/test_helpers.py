@@ -0,0 +1,54 @@
+"""
+Testes das funções auxiliares (app/utils/helpers.py)
+Execute: python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.config.settings import DATE_FORMATS
+from app.utils.helpers import convert_date_series, safe_convert_numeric, safe_convert_numeric_series
+
+
+class ConvertDateSeriesTest(unittest.TestCase):
+    
+    def test_year_only_column_is_not_a_date(self):
+        for series in (pd.Series([2023, 2024, 2023]),
+                       pd.Series([2023.0, None]),
+                       pd.Series(['2023', '2024'])):
+            result = convert_date_series(series, DATE_FORMATS)
+            self.assertTrue(result.isna().all(), series.tolist())
+    
+    def test_year_month_text_is_not_a_date(self):
+        result = convert_date_series(pd.Series(['2024-01', '2024-02']), DATE_FORMATS)
+        self.assertTrue(result.isna().all())
+    
+    def test_iso_and_configured_formats(self):
+        series = pd.Series([' 2024-01-05 ', '2024-01-05T10:20:30', '31/12/2023', 'x', None])
+        result = convert_date_series(series, DATE_FORMATS)
+        expected = [pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-05 10:20:30'),
+                    pd.Timestamp('2023-12-31'), pd.NaT, pd.NaT]
+        self.assertEqual(result.tolist(), expected)
+
+
+
+class SafeConvertNumericSeriesTest(unittest.TestCase):
+    
+    def test_mixed_object_matches_scalar_version(self):
+        series = pd.Series([' 12,5 ', 3, 2.5, pd.Timestamp('2024-01-01'), None, 'abc', object()],
+                           dtype=object)
+        result = safe_convert_numeric_series(series)
+        expected = [np.nan if value is None else value
+                    for value in map(safe_convert_numeric, series)]
+        np.testing.assert_array_equal(result.to_numpy(), np.array(expected, dtype=float))
+        self.assertEqual(result.tolist()[:3], [12.5, 3.0, 2.5])
+    
+    def test_object_without_strings(self):
+        series = pd.Series([pd.Timestamp('2024-01-01'), pd.Timestamp('2024-01-02')], dtype=object)
+        self.assertTrue(safe_convert_numeric_series(series).isna().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+Testes das métricas (app/services/metrics.py)
+Execute: python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.services.metrics import MetricsCalculator
+
+
+class TimezoneAwareDatesTest(unittest.TestCase):
+    
+    def setUp(self):
+        dates = pd.date_range('2024-01-01', periods=60, freq='D', tz='America/Sao_Paulo')
+        self.calc = MetricsCalculator(pd.DataFrame({'data': dates, 'valor': np.arange(60.0)}))
+        self.start = pd.Timestamp('2024-02-01', tz='America/Sao_Paulo')
+        self.end = pd.Timestamp('2024-02-10', tz='America/Sao_Paulo')
+    
+    def test_period_comparison(self):
+        result = self.calc.get_period_comparison(self.start, self.end)
+        self.assertEqual(result['current_total'], float(sum(range(31, 41))))
+        self.assertEqual(result['previous_total'], float(sum(range(21, 31))))
+    
+    def test_filter_and_aggregation(self):
+        filtered = self.calc.filter_data(self.start, self.end.tz_convert('UTC'))
+        self.assertEqual(len(filtered.df), 10)
+        aggregated = self.calc.get_temporal_aggregation('W', self.start, self.end)
+        self.assertEqual(aggregated['total'].sum(), float(sum(range(31, 41))))
+
+
+if __name__ == '__main__':
+    unittest.main()
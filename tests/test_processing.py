@@ -0,0 +1,34 @@
+"""
+Testes do processamento de dados (app/services/processing.py)
+Execute: python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from app.services.processing import DataProcessor
+
+
+class AddCalculatedColumnsTest(unittest.TestCase):
+    
+    def test_nullable_integer_cumulative_keeps_na(self):
+        df = pd.DataFrame({
+            'data': pd.date_range('2024-01-01', periods=4, freq='D'),
+            'km': pd.array([1, None, 3, 4], dtype='Int64')
+        })
+        result = DataProcessor.add_calculated_columns(df, 'km')
+        cumulative = result['km_acumulado']
+        self.assertEqual(cumulative.dtype, pd.Int64Dtype())
+        self.assertEqual(cumulative.tolist(), [1, pd.NA, 4, 8])
+    
+    def test_integer_cumulative_stays_int64(self):
+        df = pd.DataFrame({'km': np.array([1, 2, 3], dtype=np.int8)})
+        result = DataProcessor.add_calculated_columns(df, 'km')
+        self.assertEqual(result['km_acumulado'].dtype, np.int64)
+        self.assertEqual(result['km_acumulado'].tolist(), [1, 3, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()